@@ -0,0 +1,138 @@
+"""
+Compares the benchmark suite (`test_*.py` in this directory) between two
+commits and reports regressions.
+
+The current version of the suite is run against the `metalib` package of
+each commit (checked out in a temporary git worktree), so both runs measure
+the same benchmarks. If `head` is omitted, the working tree is used.
+
+Usage:
+
+    python -m benchmarks.compare BASE [HEAD] [--threshold PERCENT]
+                                 [-- PYTEST_ARGS...]
+
+The exit code is 1 if a benchmark is slower than `threshold` percent in the
+second commit.
+"""
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Union
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def run_suite(source: Path, suite: Path, output: Path,
+              pytest_args: List[str]) -> Dict[str, float]:
+    """
+    Runs the benchmark suite against the package in the `source` directory
+    and returns the median time (in seconds) of each benchmark.
+    """
+    # running in the source directory puts its package first on `sys.path`
+    subprocess.run([
+        sys.executable, '-m', 'pytest',
+        str(suite), '-q', '-p', 'no:cacheprovider', f'--rootdir={suite}',
+        f'--benchmark-json={output}', *pytest_args
+    ],
+                   cwd=source,
+                   check=True)
+    results = json.loads(output.read_text())
+    return {
+        benchmark['name']: benchmark['stats']['median']
+        for benchmark in results['benchmarks']
+    }
+
+
+def run_commit(name: str, commit: Union[None, str], suite: Path, workdir: Path,
+               pytest_args: List[str]) -> Dict[str, float]:
+    label = commit or 'working tree'
+    print(f'running benchmarks for {label}...', flush=True)
+    if commit is None:
+        return run_suite(ROOT, suite, workdir / f'{name}.json', pytest_args)
+
+    worktree = workdir / 'worktree'
+    subprocess.run(
+        ['git', 'worktree', 'add', '--detach', '-q',
+         str(worktree), commit],
+        cwd=ROOT,
+        check=True)
+    try:
+        return run_suite(worktree, suite, workdir / f'{name}.json',
+                         pytest_args)
+    finally:
+        subprocess.run(['git', 'worktree', 'remove', '--force',
+                        str(worktree)],
+                       cwd=ROOT,
+                       check=True)
+
+
+def report(base: Dict[str, float], head: Dict[str, float],
+           threshold: float) -> List[str]:
+    """
+    Prints the median times of both runs and returns the names of the
+    benchmarks that are slower by more than `threshold` (fraction).
+    """
+    regressions = []
+    width = max(map(len, base.keys() | head.keys()), default=0)
+    print(f'{"benchmark":<{width}} {"base":>12} {"head":>12} {"change":>8}')
+    for name in sorted(base.keys() | head.keys()):
+        if name not in base or name not in head:
+            print(f'{name:<{width}} {"(only in one run)":>34}')
+            continue
+        change = head[name] / base[name] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif change < -threshold:
+            flag = '  improvement'
+        print(f'{name:<{width}} {base[name] * 1e6:10.1f}us '
+              f'{head[name] * 1e6:10.1f}us {change:+8.1%}{flag}')
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Compare the benchmark suite between two commits.')
+    parser.add_argument('base', help='the baseline commit')
+    parser.add_argument('head',
+                        nargs='?',
+                        help='the commit to compare (default: working tree)')
+    parser.add_argument('--threshold',
+                        type=float,
+                        default=10.0,
+                        help='regression threshold in percent (default: 10)')
+    # arguments after `--` are passed to pytest
+    argv = sys.argv[1:] if argv is None else argv
+    pytest_args = []
+    if '--' in argv:
+        split = argv.index('--')
+        argv, pytest_args = argv[:split], argv[split + 1:]
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        workdir = Path(workdir)
+
+        # copy the suite, so both commits run the same benchmarks
+        suite = workdir / 'suite'
+        shutil.copytree(Path(__file__).parent,
+                        suite,
+                        ignore=shutil.ignore_patterns('__pycache__'))
+
+        base = run_commit('base', args.base, suite, workdir, pytest_args)
+        head = run_commit('head', args.head, suite, workdir, pytest_args)
+
+    regressions = report(base, head, args.threshold / 100)
+    if regressions:
+        print(f'\n{len(regressions)} regression(s) above '
+              f'{args.threshold:g}%.')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Synthetic metadata trees for the benchmark suite.
+
+Each tree is a mapping with `leaves` scalar parameters and a `children`
+list of `breadth` sub-trees, nested `depth` levels deep. The innermost
+sub-trees have no children.
+"""
+from pathlib import Path
+
+import pytest
+
+import metalib
+
+# (breadth, depth, leaves)
+SHAPES = [
+    (10, 3, 5),  # balanced
+    (30, 2, 10),  # wide, many parameters
+    (2, 10, 2),  # deep
+]
+
+
+def synthetic_tree(breadth: int, depth: int, leaves: int, level: int = 0):
+    node = {f'p{k}': level * leaves + k for k in range(leaves)}
+    if level < depth:
+        node['children'] = [
+            synthetic_tree(breadth, depth, leaves, level + 1)
+            for _ in range(breadth)
+        ]
+    if level == 0:
+        node['name'] = 'root'  # inherited by all sub-trees
+    return node
+
+
+def deepest(node: metalib.MetadataNode) -> metalib.MetadataNode:
+    while 'children' in node:
+        node = node['children'][-1]
+    return node
+
+
+@pytest.fixture(params=SHAPES, ids=lambda shape: 'b{}-d{}-l{}'.format(*shape))
+def shape(request):
+    return request.param
+
+
+@pytest.fixture
+def obj(shape) -> dict:
+    return synthetic_tree(*shape)
+
+
+@pytest.fixture
+def meta(obj) -> metalib.MetadataNode:
+    return metalib.from_obj(obj)
+
+
+@pytest.fixture
+def yaml_file(meta, tmp_path: Path) -> Path:
+    filename = tmp_path / 'tree.yaml'
+    metalib.to_yaml(filename, meta)
+    return filename
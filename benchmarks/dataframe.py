@@ -0,0 +1,47 @@
+"""
+Conversion of query results to a data frame.
+
+Compares `metalib.to_dataframe` with a naive loop that calls `get_param`
+once per dataset and builds the data frame row by row.
+
+Usage:
+
+    python -m benchmarks.dataframe [n_datasets]
+"""
+import sys
+import timeit
+
+from pandas import DataFrame
+
+import metalib
+
+
+def create_datasets(n_datasets: int):
+    obj = dict(name='benchmark',
+               value=2.4,
+               groups=[
+                   dict(group=g,
+                        datasets=[
+                            dict(p1=str(k), p2=k, p3=k * 0.5, p4=dict(x=k))
+                            for k in range(g * 100, (g + 1) * 100)
+                        ]) for g in range(n_datasets // 100)
+               ])
+    meta = metalib.from_obj(obj)
+    return list(meta.query(has=['p1']))
+
+
+def naive(datasets, keys):
+    return DataFrame([ds.get_param(keys) for ds in datasets], columns=keys)
+
+
+if __name__ == '__main__':
+    n_datasets = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    datasets = create_datasets(n_datasets)
+    keys = ['p1', 'p2', 'p3', 'group', 'name', 'value']
+
+    for label, func in [
+        ('get_param loop', lambda: naive(datasets, keys)),
+        ('to_dataframe', lambda: metalib.to_dataframe(datasets, keys)),
+    ]:
+        seconds = min(timeit.repeat(func, number=1, repeat=3))
+        print(f'{label:>15}: {seconds:.3f} s ({len(datasets)} datasets)')
@@ -0,0 +1,38 @@
+"""
+Peak memory of `metalib.iter_yaml` compared with `metalib.from_yaml` when
+iterating over a huge list in a metadata file.
+
+Usage:
+
+    python -m benchmarks.iter_yaml [n_entries]
+"""
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import metalib
+from benchmarks.yaml_modes import write_file
+
+
+def measure(label: str, iterate):
+    start = time.perf_counter()
+    sum(entry.Re for entry in iterate())
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    sum(entry.Re for entry in iterate())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{label:>20}: {elapsed:.3f} s, peak {peak / 2**20:.1f} MiB')
+
+
+if __name__ == '__main__':
+    n_entries = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = Path(tmp) / 'benchmark.yaml'
+        write_file(filename, n_entries)
+        measure('from_yaml (fast)',
+                lambda: metalib.from_yaml(filename, mode='fast').datasets)
+        measure('iter_yaml', lambda: metalib.iter_yaml(filename, 'datasets'))
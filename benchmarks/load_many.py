@@ -0,0 +1,53 @@
+"""
+Loading of many metadata files with `metalib.load_many`.
+
+Writes a number of synthetic metadata files to a temporary directory and
+compares a `from_yaml` loop with `load_many` using an increasing number of
+worker processes.
+
+Usage:
+
+    python -m benchmarks.load_many [n_files]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from ruamel.yaml import YAML
+
+import metalib
+
+
+def write_files(directory: Path, n_files: int, n_entries: int = 100):
+    yaml = YAML()
+    for k in range(n_files):
+        obj = dict(name=f'file{k}',
+                   datasets=[
+                       dict(Re=i * 1000, Vdot=i * 16.8, source=f'raw/{k}/{i}')
+                       for i in range(n_entries)
+                   ])
+        yaml.dump(obj, directory / f'file{k:05d}.yaml')
+
+
+def measure(label: str, func):
+    start = time.perf_counter()
+    func()
+    print(f'{label:>22}: {time.perf_counter() - start:.3f} s')
+
+
+if __name__ == '__main__':
+    n_files = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        write_files(directory, n_files)
+        filenames = sorted(directory.glob('*.yaml'))
+
+        measure('from_yaml loop',
+                lambda: [metalib.from_yaml(f) for f in filenames])
+        workers = 1
+        while workers <= (os.cpu_count() or 1):
+            measure(f'load_many({workers} workers)',
+                    lambda: metalib.load_many(directory, workers=workers))
+            workers *= 2
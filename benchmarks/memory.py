@@ -0,0 +1,54 @@
+"""
+Memory footprint of fully materialized metadata trees.
+
+Builds a synthetic metadata object, wraps it with `metalib.from_obj`, touches
+every value (so that lazily created child nodes are materialized as well) and
+reports the memory allocated for the node tree in bytes per scalar leaf. The
+memory of the wrapped python object itself is not included.
+
+Usage:
+
+    python -m benchmarks.memory [n_entries] [n_leaves]
+"""
+import collections.abc
+import sys
+import tracemalloc
+
+import metalib
+
+
+def create_obj(n_entries: int, n_leaves: int) -> dict:
+    return dict(
+        name='benchmark',
+        entries=[{f'p{k}': float(i * n_leaves + k)
+                  for k in range(n_leaves)} for i in range(n_entries)],
+    )
+
+
+def touch(node):
+    if isinstance(node, collections.abc.Mapping):
+        values = node.values()
+    else:
+        values = iter(node)
+    for value in values:
+        if isinstance(value, metalib.MetadataNode):
+            touch(value)
+
+
+def bytes_per_leaf(n_entries: int = 10000, n_leaves: int = 10) -> float:
+    obj = create_obj(n_entries, n_leaves)
+
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    meta = metalib.from_obj(obj)
+    touch(meta)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return (current - start) / (n_entries * n_leaves + 1)
+
+
+if __name__ == '__main__':
+    n_entries, n_leaves = (int(arg) for arg in (sys.argv[1:] or [10000, 10]))
+    print(f'{bytes_per_leaf(n_entries, n_leaves):.1f} bytes per leaf '
+          f'({n_entries} entries x {n_leaves} leaves)')
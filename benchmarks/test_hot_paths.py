@@ -0,0 +1,84 @@
+"""
+Benchmarks of the core hot paths on synthetic trees (see `conftest.py`).
+
+Usage:
+
+    python -m pytest benchmarks
+
+Use `python -m benchmarks.compare` to compare the results of two commits.
+"""
+import inspect
+from pathlib import Path
+
+import pytest
+
+import metalib
+from conftest import deepest
+
+
+def iterate(node):
+    # visit all values through the public iteration protocols
+    count = 0
+    values = node.values() if hasattr(node, 'values') else node
+    for value in values:
+        count += 1
+        if isinstance(value, metalib.MetadataNode):
+            count += iterate(value)
+    return count
+
+
+def test_from_obj(benchmark, obj):
+    benchmark(metalib.from_obj, obj)
+
+
+def test_from_obj_materialize(benchmark, obj):
+    # creating a node is lazy, so also access all child nodes
+    benchmark(lambda: iterate(metalib.from_obj(obj)))
+
+
+@pytest.mark.parametrize('mode', ['roundtrip', 'fast'])
+def test_from_yaml(benchmark, yaml_file: Path, mode: str):
+    if 'mode' not in inspect.signature(metalib.from_yaml).parameters:
+        if mode != 'roundtrip':
+            pytest.skip('load modes are not supported')
+        benchmark(metalib.from_yaml, yaml_file)
+    else:
+        benchmark(metalib.from_yaml, yaml_file, mode=mode)
+
+
+def test_to_yaml(benchmark, meta, tmp_path: Path):
+    benchmark(metalib.to_yaml, tmp_path / 'dump.yaml', meta)
+
+
+def test_inherited_getattr(benchmark, meta):
+    node = deepest(meta)
+    benchmark(lambda: node.name)
+
+
+def test_get_param(benchmark, meta):
+    node = deepest(meta)
+    benchmark(node.get_param, 'name')
+
+
+def test_has_param_miss(benchmark, meta):
+    node = deepest(meta)
+    benchmark(node.has_param, 'missing')
+
+
+def test_query(benchmark, meta):
+    benchmark(lambda: list(meta.query(lambda node: node.p0 % 2 == 0)))
+
+
+def test_first(benchmark, meta):
+    # the deepest node is visited last
+    target = deepest(meta).p0
+    benchmark(meta.first, lambda node: node.p0 == target)
+
+
+def test_repr(benchmark, meta):
+    benchmark(repr, meta)
+
+
+def test_iteration(benchmark, meta):
+    iterate(meta)  # create the child nodes first
+    benchmark(iterate, meta)
@@ -0,0 +1,59 @@
+"""
+Throughput of the tree traversal used by `query`.
+
+Compares `MetadataNode.walk` (explicit stack) with the recursive generator
+implementation that `query` used before, on a wide and on a deep tree.
+
+Usage:
+
+    python -m benchmarks.traversal
+"""
+import timeit
+
+import metalib
+
+
+def recursive_query(node, predicate):
+    # the former implementation of `MetadataNode.query`
+    for child in node._iter_nodes_():
+        yield from recursive_query(child, predicate)
+        try:
+            if predicate(child):
+                yield child
+        except AttributeError:
+            pass
+
+
+def wide_tree(n_entries: int = 20000) -> metalib.MetadataNode:
+    return metalib.from_obj(
+        dict(params=[dict(p1=k, p4=dict(x=k)) for k in range(n_entries)]))
+
+
+def deep_tree(depth: int = 500) -> metalib.MetadataNode:
+    obj = node = dict()
+    for k in range(depth):
+        node['child'] = dict(level=k)
+        node = node['child']
+    return metalib.from_obj(obj)
+
+
+def run(name: str, meta: metalib.MetadataNode, repeat: int = 7):
+    n_nodes = sum(1 for _ in meta.walk())
+
+    predicates = {
+        'all': lambda node: True,
+        'selective': lambda node: ('x' in node) and (node.x % 100 == 0),
+    }
+    for label, predicate in predicates.items():
+        for impl, func in [
+            ('recursive', lambda: list(recursive_query(meta, predicate))),
+            ('walk', lambda: list(meta.query(predicate))),
+        ]:
+            seconds = min(timeit.repeat(func, number=1, repeat=repeat))
+            print(f'{name:>5} {label:>10} {impl:>10}: '
+                  f'{n_nodes / seconds:12,.0f} nodes/s')
+
+
+if __name__ == '__main__':
+    run('wide', wide_tree())
+    run('deep', deep_tree())
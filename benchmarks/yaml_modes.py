@@ -0,0 +1,49 @@
+"""
+Parse time and memory of the YAML load modes of `metalib.from_yaml`.
+
+Writes a synthetic metadata file and loads it in `'roundtrip'` and
+`'fast'` mode.
+
+Usage:
+
+    python -m benchmarks.yaml_modes [n_entries]
+"""
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from ruamel.yaml import YAML
+
+import metalib
+
+
+def write_file(filename: Path, n_entries: int):
+    obj = dict(name='benchmark',
+               datasets=[
+                   dict(Re=i * 1000, Vdot=i * 16.8, source=f'raw/{i}')
+                   for i in range(n_entries)
+               ])
+    YAML().dump(obj, filename)
+
+
+def measure(filename: Path, mode: str):
+    start = time.perf_counter()
+    metalib.from_yaml(filename, mode=mode)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    meta = metalib.from_yaml(filename, mode=mode)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{mode:>10}: {elapsed:.3f} s, {memory / 2**20:.1f} MiB')
+
+
+if __name__ == '__main__':
+    n_entries = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = Path(tmp) / 'benchmark.yaml'
+        write_file(filename, n_entries)
+        for mode in ('roundtrip', 'fast'):
+            measure(filename, mode)
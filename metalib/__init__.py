@@ -1,33 +1,66 @@
 __version__ = '0.3.3'
 
-from typing import List, Union, Iterable
+import importlib
 
-from pandas import DataFrame
 from .core import *
-from ._yaml import from_yaml, to_yaml
-
-
-def to_dataframe(datasets: List[MetadataNode],
-                 include_keys: Union[str, Iterable[str]] = None,
-                 exclude_keys: Union[str, Iterable[str]] = None) -> DataFrame:
-    raise NotImplementedError()
-    # get common parameter keys
-    keys = set()
-    for ds in datasets:
-        if isinstance(ds, dict):
-            keys.update(ds.keys())
-
-    # include/exclude keys
-    if include_keys is not None:
-        if isinstance(include_keys, str):
-            include_keys = [include_keys]
-        keys.update(include_keys)
-    if exclude_keys is not None:
-        if isinstance(exclude_keys, str):
-            exclude_keys = [exclude_keys]
-        keys.difference_update(exclude_keys)
-    keys = list(keys)
-
-    data = [ds.get_param(keys) for ds in datasets]
-    df = DataFrame(data, columns=keys)
-    return df
+from ._cache import ParseCache
+from ._diff import diff, apply_patch, DiffOperation
+from ._instrument import instrument, Instrumentation
+
+# Names provided by submodules that depend on pandas or ruamel.yaml/toolz.
+# These modules are imported when one of the names is first accessed, so
+# that `import metalib` stays fast for code that only uses `from_obj`.
+_LAZY_ATTRIBUTES = {
+    'to_dataframe': '._dataframe',
+    'from_yaml': '._yaml',
+    'to_yaml': '._yaml',
+    'iter_yaml': '._yaml',
+    'load_many': '._yaml',
+    'scan': '._yaml',
+    'MetadataLoadError': '._yaml',
+    'MetadataScan': '._yaml',
+    'Provenance': '._yaml',
+    'async_from_yaml': '._async',
+    'async_to_yaml': '._async',
+    'async_load_many': '._async',
+    'async_save_many': '._async',
+    'async_gather': '._async',
+    'async_capture_provenance': '._async',
+}
+
+
+# `from metalib import *` also provides the lazy names (which imports the
+# submodules); `import metalib` stays lazy
+__all__ = [
+    'MetadataNode',
+    'MetadataScalarNode',
+    'MetadataArrayNode',
+    'MetadataCollectionNode',
+    'MetadataMutableMappingNode',
+    'MetadataMutableSequenceNode',
+    'MetadataConcatNode',
+    'from_obj',
+    'concat',
+    'ParseCache',
+    'diff',
+    'apply_patch',
+    'DiffOperation',
+    'instrument',
+    'Instrumentation',
+    *_LAZY_ATTRIBUTES,
+]
+
+
+def __getattr__(name: str):
+    try:
+        module = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError(
+            f'module {__name__!r} has no attribute {name!r}') from None
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value  # skip this function on the next access
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
@@ -0,0 +1,217 @@
+import asyncio
+import functools
+import subprocess
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Awaitable, Iterable, List, Tuple, TypeVar, Union
+
+from .core import MetadataNode
+from . import _instrument
+from ._cache import ParseCache, _file_state
+from ._yaml import (MetadataLoadError, Provenance, _cached_git_label,
+                    _create_yaml_loader, _expand_paths, _get_caller_filepath,
+                    _git_commit_cache, _git_state, _is_unchanged,
+                    _parse_tracked_files, from_yaml, to_yaml)
+
+T = TypeVar('T')
+
+
+async def _run_in_executor(executor: Union[None, Executor], func, *args,
+                           **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor,
+                                      functools.partial(func, *args, **kwargs))
+
+
+async def _async_git_output(*args: str,
+                            cwd: Union[None, str] = None) -> Union[None, str]:
+    # same as `_git_output`, but without blocking the event loop
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "git",
+            *args,
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL)
+        stdout, _ = await process.communicate()
+    except OSError:
+        return None
+    return stdout.decode() if process.returncode == 0 else None
+
+
+async def _async_tracked_files() -> Tuple[Path, ...]:
+    toplevel = await _async_git_output('rev-parse', '--show-toplevel')
+    if not toplevel:
+        return ()
+    return _parse_tracked_files(
+        toplevel, await _async_git_output('ls-files',
+                                          '-z',
+                                          cwd=toplevel.strip()))
+
+
+async def _async_get_git_commit_hash() -> Union[str, None]:
+    # same as `_get_git_commit_hash`, but without blocking the event loop
+    directory = Path.cwd()
+    state = _git_state(directory)
+    hit, label = _cached_git_label(directory, state)
+    if hit:
+        return label
+
+    files = await _async_tracked_files() if state else ()
+    file_states = tuple(map(_file_state, files))
+    try:
+        process = await asyncio.create_subprocess_exec("git",
+                                                       "describe",
+                                                       "--always",
+                                                       "--dirty",
+                                                       stdout=subprocess.PIPE)
+        stdout, _ = await process.communicate()
+        if process.returncode == 0:
+            label = stdout.decode().strip()
+        else:
+            label = None
+    except OSError:
+        label = None
+    _git_commit_cache[directory] = (state, files, file_states, label)
+    return label
+
+
+async def async_capture_provenance() -> Provenance:
+    """
+    Captures the provenance of the calling script (see
+    `Provenance.capture`) without blocking the event loop.
+    """
+    script = _get_caller_filepath().name
+    return Provenance(script, await _async_get_git_commit_hash())
+
+
+async def async_from_yaml(
+        filename: Union[str, Path],
+        mode: str = 'roundtrip',
+        cache: Union[None, str, Path, ParseCache] = None,
+        executor: Union[None, Executor] = None) -> MetadataNode:
+    """
+    Loads metadata from a YAML file (see `from_yaml`). Reading and parsing
+    the file runs in the `executor` (default: the default executor of the
+    event loop).
+    """
+    return await _run_in_executor(executor, from_yaml, filename, mode, cache)
+
+
+async def async_to_yaml(filename: Union[str, Path],
+                        metadata: MetadataNode,
+                        description: Union[None, str, Iterable[str]] = None,
+                        provenance: Union[None, Provenance] = None,
+                        executor: Union[None, Executor] = None,
+                        only_if_changed: bool = False) -> bool:
+    """
+    Saves metadata to a YAML file (see `to_yaml`). The provenance is
+    captured without blocking the event loop; serializing and writing the
+    file runs in the `executor` (default: the default executor of the event
+    loop). The metadata must not be modified until the file is written.
+    Returns `True` if the file was written (see `only_if_changed`).
+    """
+    if only_if_changed and _is_unchanged(Path(filename), metadata):
+        # skip capturing the provenance
+        _instrument._count('to_yaml.skipped')
+        return False
+    if provenance is None:
+        provenance = await async_capture_provenance()
+    return await _run_in_executor(executor, to_yaml, filename, metadata,
+                                  description, provenance, only_if_changed)
+
+
+async def async_gather(aws: Iterable[Awaitable[T]], limit: int = 8) -> List[T]:
+    """
+    Awaits the given awaitables (e.g. coroutines) with at most `limit` of
+    them running at the same time and returns their results in order. If an
+    awaitable fails, the remaining awaitables are not started and the
+    exception is raised once the running awaitables have finished.
+    """
+    aws = list(aws)
+    results = [None] * len(aws)
+    semaphore = asyncio.Semaphore(limit)
+    failed = False
+
+    async def run(index: int, aw: Awaitable[T]):
+        nonlocal failed
+        async with semaphore:
+            if failed:
+                if asyncio.iscoroutine(aw):
+                    aw.close()  # avoid "never awaited" warnings
+                return
+            try:
+                results[index] = await aw
+            except BaseException:
+                failed = True
+                raise
+
+    outcomes = await asyncio.gather(*(run(index, aw)
+                                      for index, aw in enumerate(aws)),
+                                    return_exceptions=True)
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            raise outcome
+    return results
+
+
+async def async_load_many(
+    paths_or_glob: Union[str, Path, Iterable[Union[str, Path]]],
+    limit: int = 8,
+    errors: str = 'raise',
+    mode: str = 'fast',
+    executor: Union[None, Executor] = None,
+) -> List[MetadataNode]:
+    """
+    Loads many metadata files with at most `limit` files being loaded at
+    the same time (see `load_many` for the other arguments).
+    """
+    if errors not in ('raise', 'skip'):
+        raise ValueError('"errors" must be "raise" or "skip".')
+    _create_yaml_loader(mode)  # validate mode
+
+    async def load(filename: Path) -> Tuple[Path, MetadataNode, str]:
+        try:
+            node = await async_from_yaml(filename, mode, executor=executor)
+            return filename, node, None
+        except Exception as e:
+            return filename, None, f'{type(e).__name__}: {e}'
+
+    filenames = _expand_paths(paths_or_glob)
+    loaded = await async_gather((load(filename) for filename in filenames),
+                                limit)
+
+    results = [node for _, node, message in loaded if message is None]
+    failed = {
+        filename: message
+        for filename, _, message in loaded if message is not None
+    }
+    if failed and errors == 'raise':
+        raise MetadataLoadError(failed, results)
+    return results
+
+
+async def async_save_many(
+    items: Iterable[Tuple[Union[str, Path], MetadataNode]],
+    description: Union[None, str, Iterable[str]] = None,
+    limit: int = 8,
+    executor: Union[None, Executor] = None,
+    only_if_changed: bool = False,
+) -> List[bool]:
+    """
+    Saves many metadata structures, given as `(filename, metadata)` pairs,
+    with at most `limit` files being written at the same time. The
+    provenance is captured once for all files. Returns whether each file
+    was written (see `to_yaml` for `only_if_changed`).
+    """
+    provenance = await async_capture_provenance()
+    saves = [
+        async_to_yaml(filename,
+                      metadata,
+                      description,
+                      provenance,
+                      executor=executor,
+                      only_if_changed=only_if_changed)
+        for filename, metadata in items
+    ]
+    return await async_gather(saves, limit)
@@ -0,0 +1,133 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Tuple, Union
+
+from . import _instrument
+
+# bump to invalidate cache entries written by older versions
+_CACHE_FORMAT = 1
+
+
+def _file_state(filename: Path) -> Union[None, Tuple[int, int]]:
+    # modification time and size of a file, which identify the version of
+    # the file (`None` if the file does not exist)
+    try:
+        stat = filename.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ParseCache:
+    """
+    Persistent cache of parsed YAML files.
+
+    The parsed python objects are stored in pickle files in the cache
+    directory; one file per (resolved) file path and load mode. An entry is
+    stale if the modification time or the size of the YAML file changed and
+    is replaced by the result of a new parse.
+
+    Args:
+
+    - `directory (str, Path)`: The cache directory (created if necessary).
+    - `max_size (int)`: Maximum total size of the cache files in bytes. If
+      the cache grows beyond this size, the least recently used entries are
+      removed.
+    """
+    def __init__(self,
+                 directory: Union[str, Path],
+                 max_size: int = 256 * 2**20):
+        self.directory = Path(directory)
+        self.max_size = max_size
+
+    def _entry_filename(self, filename: Path, mode: str) -> Path:
+        key = f'{mode}:{filename.resolve()}'.encode('utf-8')
+        return self.directory / f'{hashlib.sha1(key).hexdigest()}.pickle'
+
+    def get(self, filename: Path, mode: str) -> Tuple[bool, Any]:
+        """
+        Returns `(True, obj)` if the cache contains an up-to-date entry for
+        the file and `(False, None)` otherwise.
+        """
+        entry = self._entry_filename(filename, mode)
+        try:
+            with open(entry, 'rb') as f:
+                header = pickle.load(f)
+                if header != (_CACHE_FORMAT, _file_state(filename)):
+                    return False, None  # stale entry
+                obj = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return False, None
+
+        # mark as recently used (for the eviction of old entries)
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return True, obj
+
+    def put(self, filename: Path, mode: str, obj: Any, state: Tuple[int, int]):
+        """
+        Stores the parsed object of a file with the file `state` (`mtime`
+        and size) before parsing.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        # write to a temporary file first, so concurrent readers never see
+        # a partially written entry
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((_CACHE_FORMAT, state),
+                            f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._entry_filename(filename, mode))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.evict()
+
+    def load(self, filename: Path, mode: str, parse: Callable[[str], Any]):
+        """
+        Returns the parsed object of the file from the cache or parses the
+        file with `parse(text)` and adds the result to the cache.
+        """
+        hit, obj = self.get(filename, mode)
+        _instrument._count('parse_cache.hit' if hit else 'parse_cache.miss')
+        if not hit:
+            state = _file_state(filename)
+            obj = parse(filename.read_text())
+            self.put(filename, mode, obj, state)
+        return obj
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the total size of the
+        cache is below `max_size`.
+        """
+        entries = []
+        for entry in self.directory.glob('*.pickle'):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue  # removed concurrently
+            entries.append((stat.st_mtime_ns, stat.st_size, entry))
+
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, entry in sorted(entries, key=lambda e: e[0]):
+            if size <= self.max_size:
+                break
+            try:
+                entry.unlink()
+            except OSError:
+                pass
+            size -= entry_size
+
+    def clear(self):
+        """Removes all entries from the cache."""
+        for entry in self.directory.glob('*.pickle'):
+            entry.unlink()
@@ -0,0 +1,110 @@
+from typing import Any, Iterable, List, Union
+
+from pandas import DataFrame
+
+from .core import _SCALAR_TYPES, MetadataMutableMappingNode, MetadataNode
+
+
+def _parameter_scopes(datasets: List[MetadataNode]) -> List[Union[None, dict]]:
+    # resolve the parameters visible to the parent of each dataset in one
+    # top-down pass (shared parents are resolved only once)
+    scopes = {}
+
+    def resolve(node: Union[None, MetadataNode]) -> Union[None, dict]:
+        # collect the unresolved ancestors of the node
+        chain = []
+        while node is not None and id(node) not in scopes:
+            chain.append(node)
+            node = node._parent
+        scope = None if node is None else scopes[id(node)]
+
+        # resolve from the top down
+        for node in reversed(chain):
+            if isinstance(node, MetadataMutableMappingNode):
+                scope = dict(scope or {})
+                scope.update((key, node[key]) for key in node._ref)
+            scopes[id(node)] = scope
+        return scope
+
+    return [resolve(ds._parent) for ds in datasets]
+
+
+def _lookup_parameter(ds: MetadataNode, scope: Union[None, dict],
+                      key: str) -> Any:
+    if isinstance(ds, MetadataMutableMappingNode) and key in ds._ref:
+        return ds[key]
+    elif scope is not None and key in scope:
+        return scope[key]
+    elif '.' in key:
+        # nested key in dotted notation
+        name, *parts = key.split('.')
+        value = _lookup_parameter(ds, scope, name)
+        for part in parts:
+            if not isinstance(value, MetadataMutableMappingNode):
+                return None
+            value = value.get(part)
+        return value
+    else:
+        return None
+
+
+def to_dataframe(datasets: List[MetadataNode],
+                 include_keys: Union[str, Iterable[str]] = None,
+                 exclude_keys: Union[str, Iterable[str]] = None) -> DataFrame:
+    """
+    Collects the parameters of the given datasets in a data frame with one
+    row per dataset and one column per parameter.
+
+    Args:
+
+    - `datasets (list)`: The datasets, e.g. the result of a query.
+    - `include_keys (str, list)`: Parameters that are added to the keys of
+      the datasets. Parameters may be inherited from parent nodes and nested
+      keys can be given in dotted notation, e.g. `'p4.x'`.
+    - `exclude_keys (str, list)`: Parameters that are not included.
+
+    Returns:
+
+    `DataFrame`: The parameters of the datasets; missing parameters are
+    set to `None`/`NaN`.
+    """
+    datasets = list(datasets)
+
+    # get common parameter keys (in order of appearance)
+    keys = {}
+    for ds in datasets:
+        if isinstance(ds, MetadataMutableMappingNode):
+            keys.update(dict.fromkeys(ds._ref))
+
+    # include/exclude keys
+    if include_keys is not None:
+        if isinstance(include_keys, str):
+            include_keys = [include_keys]
+        keys.update(dict.fromkeys(include_keys))
+    if exclude_keys is not None:
+        if isinstance(exclude_keys, str):
+            exclude_keys = [exclude_keys]
+        for key in exclude_keys:
+            keys.pop(key, None)
+    keys = list(keys)
+
+    # build the data frame column by column
+    scopes = _parameter_scopes(datasets)
+    refs = [
+        ds._ref if isinstance(ds, MetadataMutableMappingNode) else {}
+        for ds in datasets
+    ]
+    columns = {}
+    for key in keys:
+        column = []
+        for ds, ref, scope in zip(datasets, refs, scopes):
+            if key in ref:
+                value = ref[key]
+                if type(value) not in _SCALAR_TYPES:
+                    # wrap collections in metadata nodes
+                    value = ds[key]
+            else:
+                value = _lookup_parameter(ds, scope, key)
+            column.append(value)
+        columns[key] = column
+    return DataFrame(columns, columns=keys)
@@ -0,0 +1,359 @@
+import copy
+from typing import (Any, Dict, Iterable, List, MutableMapping, MutableSequence,
+                    NamedTuple, Tuple, Union)
+
+from .core import (_SCALAR_TYPES, MetadataCollectionNode,
+                   MetadataMutableMappingNode, MetadataMutableSequenceNode,
+                   MetadataNode, _array_digest, _digest_token, _hash_tokens,
+                   _is_array, _is_container)
+
+# maximum number of edits searched for the middle snake of two sequences;
+# beyond that, the sequences are split at the furthest reaching path, which
+# bounds the time for very different sequences (the diff may then be
+# longer than necessary)
+_MAX_EDIT_COST = 256
+
+
+class DiffOperation(NamedTuple):
+    """
+    A single change of a metadata tree (see `diff`).
+
+    - `op (str)`: `'add'` (adds a key or inserts an item into a sequence),
+      `'remove'` (removes a key or an item) or `'replace'` (replaces the
+      value of a key or item).
+    - `path (tuple)`: The keys and sequence indices from the root node to
+      the changed value.
+    - `value`: The new value for `'add'` and `'replace'` (plain python
+      objects, not metadata nodes).
+    """
+    op: str
+    path: Tuple[Any, ...]
+    value: Any = None
+
+
+def _middle_snake(a: List[str], b: List[str], a0: int, a1: int, b0: int,
+                  b1: int) -> Union[None, Tuple[int, int]]:
+    # Returns a point (relative to `a0`, `b0`) on the middle snake of the
+    # shortest edit script of `a[a0:a1]` and `b[b0:b1]` or `None` if the
+    # sequences have no common items (Myers, "An O(ND) Difference Algorithm
+    # and Its Variations", 1986). Only O(N + M) space is used. The search is
+    # limited to `_MAX_EDIT_COST` edits.
+    n = a1 - a0
+    m = b1 - b0
+    max_d = (n + m + 1) // 2
+    offset = max_d
+    length = 2 * max_d + 2
+    forward = [-1] * length
+    reverse = [-1] * length
+    forward[offset + 1] = 0
+    reverse[offset + 1] = 0
+    delta = n - m
+    # if the delta is odd, the paths overlap during the forward search
+    odd = delta % 2 != 0
+    k1_start = k1_end = k2_start = k2_end = 0
+    best = None  # furthest reaching point of the forward search
+    best_score = -1
+    for d in range(min(max_d, _MAX_EDIT_COST)):
+        # forward search
+        for k1 in range(-d + k1_start, d + 1 - k1_end, 2):
+            index = offset + k1
+            if k1 == -d or (k1 != d
+                            and forward[index - 1] < forward[index + 1]):
+                x1 = forward[index + 1]
+            else:
+                x1 = forward[index - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[a0 + x1] == b[b0 + y1]:
+                x1 += 1
+                y1 += 1
+            forward[index] = x1
+            if x1 <= n and y1 <= m and x1 + y1 > best_score:
+                best, best_score = (x1, y1), x1 + y1
+            if x1 > n:
+                k1_end += 2  # ran off the right of the graph
+            elif y1 > m:
+                k1_start += 2  # ran off the bottom of the graph
+            elif odd:
+                other = offset + delta - k1
+                if 0 <= other < length and reverse[other] != -1:
+                    if x1 >= n - reverse[other]:
+                        return x1, y1
+
+        # reverse search
+        for k2 in range(-d + k2_start, d + 1 - k2_end, 2):
+            index = offset + k2
+            if k2 == -d or (k2 != d
+                            and reverse[index - 1] < reverse[index + 1]):
+                x2 = reverse[index + 1]
+            else:
+                x2 = reverse[index - 1] + 1
+            y2 = x2 - k2
+            while (x2 < n and y2 < m and a[a1 - x2 - 1] == b[b1 - y2 - 1]):
+                x2 += 1
+                y2 += 1
+            reverse[index] = x2
+            if x2 > n:
+                k2_end += 2
+            elif y2 > m:
+                k2_start += 2
+            elif not odd:
+                other = offset + delta - k2
+                if 0 <= other < length and forward[other] != -1:
+                    x1 = forward[other]
+                    y1 = x1 - (other - offset)
+                    if x1 >= n - x2:
+                        return x1, y1
+    if max_d > _MAX_EDIT_COST:
+        return best  # too expensive
+    return None
+
+
+def _match_sequences(a: List[str], b: List[str]) -> List[Tuple[int, int]]:
+    # Returns the index pairs `(i, j)` of the items `a[i] == b[j]` of a
+    # longest common subsequence in increasing order. The divide and
+    # conquer steps use an explicit stack instead of recursion.
+    matches = []
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        a0, a1, b0, b1 = stack.pop()
+
+        # common prefix and suffix
+        while a0 < a1 and b0 < b1 and a[a0] == b[b0]:
+            matches.append((a0, b0))
+            a0 += 1
+            b0 += 1
+        while a0 < a1 and b0 < b1 and a[a1 - 1] == b[b1 - 1]:
+            a1 -= 1
+            b1 -= 1
+            matches.append((a1, b1))
+        if a0 == a1 or b0 == b1:
+            continue
+
+        split = _middle_snake(a, b, a0, a1, b0, b1)
+        if split is None or split in ((0, 0), (a1 - a0, b1 - b0)):
+            continue  # no common items
+        x, y = split
+        stack.append((a0, a0 + x, b0, b0 + y))
+        stack.append((a0 + x, a1, b0 + y, b1))
+    matches.sort()
+    return matches
+
+
+def _plain(value: Any) -> Any:
+    # nodes that were assigned to keys are stored as nodes
+    cls = type(value)
+    if cls in _SCALAR_TYPES or cls is dict or cls is list:
+        return value
+    elif isinstance(value, MetadataNode):
+        return value._ref
+    return value
+
+
+def _is_mapping(container: Any) -> bool:
+    cls = type(container)
+    return cls is dict or (cls is not list
+                           and isinstance(container, MutableMapping))
+
+
+def _token(value: Any, digests: Dict[int, str]) -> str:
+    # same as `MetadataCollectionNode._value_token_` for a plain value
+    # (values of different types, e.g. `1` and `1.0`, have different tokens)
+    if type(value) in _SCALAR_TYPES:
+        return _digest_token(value)
+    elif _is_container(value):
+        return 'd' + digests[id(value)]
+    elif _is_array(value):
+        return 'a' + _array_digest(value)
+    return _digest_token(value)
+
+
+def _digests(root: Union[MutableMapping, MutableSequence]) -> Dict[int, str]:
+    # Computes the content digests (see `MetadataCollectionNode.digest`) of
+    # all containers of a plain tree, keyed by `id(container)`. Unlike
+    # `digest`, no nodes are created.
+    digests = {}
+    stack = [root]
+    while stack:
+        container = stack[-1]
+        is_mapping = _is_mapping(container)
+        values = container.values() if is_mapping else container
+        values = [
+            value if type(value) in _SCALAR_TYPES else _plain(value)
+            for value in values
+        ]
+        pending = [
+            value for value in values if type(value) not in _SCALAR_TYPES
+            and _is_container(value) and id(value) not in digests
+        ]
+        if pending:
+            # compute the digests of the nested containers first
+            stack.extend(pending)
+            continue
+        stack.pop()
+
+        tokens = [
+            _digest_token(value) if type(value) in _SCALAR_TYPES else _token(
+                value, digests) for value in values
+        ]
+        if is_mapping:
+            tokens = sorted(f'{_digest_token(key)}\0{token}'
+                            for key, token in zip(container, tokens))
+            digests[id(container)] = _hash_tokens('M', tokens)
+        else:
+            digests[id(container)] = _hash_tokens('L', tokens)
+    return digests
+
+
+def _same_kind(x: Any, y: Any) -> bool:
+    # both values are mappings or both are sequences
+    return (_is_container(x) and _is_container(y)
+            and _is_mapping(x) == _is_mapping(y))
+
+
+def diff(
+    a: Union[MetadataNode, MutableMapping,
+             MutableSequence], b: Union[MetadataNode, MutableMapping,
+                                        MutableSequence]
+) -> List[DiffOperation]:
+    """
+    Computes the changes that turn the metadata `a` into `b`.
+
+    Identical subtrees are skipped by comparing their content hashes (see
+    `MetadataCollectionNode.digest`). Sequences are compared item by item
+    with a linear-space longest common subsequence algorithm; changed
+    items that are both mappings (or both sequences) are diffed
+    recursively, other changed items are replaced.
+
+    Args:
+
+    - `a (MetadataNode, dict, list)`: The original metadata.
+    - `b (MetadataNode, dict, list)`: The modified metadata.
+
+    Raises:
+
+    - `ValueError`: `a` and `b` are not both mappings or both sequences.
+
+    Returns:
+
+    `list`: The `DiffOperation`s in the order they must be applied (see
+    `apply_patch`). Values are shared with `b`.
+    """
+    if (isinstance(a, MetadataCollectionNode)
+            and isinstance(b, MetadataCollectionNode) and a._digest is not None
+            and a._digest == b._digest):
+        return []  # cached digests
+
+    a, b = _plain(a), _plain(b)
+    if not _same_kind(a, b):
+        raise ValueError('"a" and "b" must both be mappings or sequences.')
+    digests_a, digests_b = _digests(a), _digests(b)
+
+    ops = []
+    stack = [((), a, b)]
+    while stack:
+        path, x, y = stack.pop()
+        if digests_a[id(x)] == digests_b[id(y)]:
+            continue  # identical subtrees
+        nested = []
+        if _is_mapping(x):
+            for key, value in x.items():
+                if key not in y:
+                    ops.append(DiffOperation('remove', path + (key, )))
+                    continue
+                value, other = _plain(value), _plain(y[key])
+                if _token(value, digests_a) == _token(other, digests_b):
+                    continue
+                elif _same_kind(value, other):
+                    nested.append((path + (key, ), value, other))
+                else:
+                    ops.append(DiffOperation('replace', path + (key, ), other))
+            for key, value in y.items():
+                if key not in x:
+                    ops.append(
+                        DiffOperation('add', path + (key, ), _plain(value)))
+        else:
+            x = [_plain(value) for value in x]
+            y = [_plain(value) for value in y]
+            matches = _match_sequences([_token(v, digests_a) for v in x],
+                                       [_token(v, digests_b) for v in y])
+            matches.append((len(x), len(y)))
+
+            # positions in the list being patched are shifted by the
+            # items inserted and removed before
+            shift = 0
+            i = j = 0
+            for next_i, next_j in matches:
+                removed, added = next_i - i, next_j - j
+                paired = min(removed, added)
+                position = i + shift
+                for k in range(paired):
+                    if _same_kind(x[i + k], y[j + k]):
+                        nested.append(
+                            (path + (position + k, ), x[i + k], y[j + k]))
+                    else:
+                        ops.append(
+                            DiffOperation('replace', path + (position + k, ),
+                                          y[j + k]))
+                for _ in range(removed - paired):
+                    ops.append(
+                        DiffOperation('remove', path + (position + paired, )))
+                for k in range(paired, added):
+                    ops.append(
+                        DiffOperation('add', path + (position + k, ),
+                                      y[j + k]))
+                shift += added - removed
+                i, j = next_i + 1, next_j + 1
+
+        # nested changes never shift the positions of the operations above
+        stack.extend(reversed(nested))
+    return ops
+
+
+def apply_patch(node: MetadataNode,
+                ops: Iterable[DiffOperation]) -> MetadataNode:
+    """
+    Applies the changes computed by `diff` to a metadata tree (in place).
+
+    The values are copied, so the patched tree does not share objects with
+    the operations.
+
+    Args:
+
+    - `node (MetadataNode)`: The metadata to modify.
+    - `ops (list)`: The `DiffOperation`s (or `(op, path, value)` tuples).
+
+    Raises:
+
+    - `ValueError`: An operation is invalid.
+    - `KeyError`, `IndexError`: A path does not exist in the metadata.
+
+    Returns:
+
+    `MetadataNode`: The modified metadata (`node`).
+    """
+    for op in ops:
+        op = DiffOperation(*op)
+        if not op.path:
+            raise ValueError('The path of an operation must not be empty.')
+        target = node
+        for key in op.path[:-1]:
+            target = target[key]
+        key = op.path[-1]
+
+        if op.op == 'add':
+            if isinstance(target, MetadataMutableSequenceNode):
+                target.insert(key, copy.deepcopy(op.value))
+            elif key in target:
+                raise ValueError(f'Key {key!r} already exists at {op.path}.')
+            else:
+                target[key] = copy.deepcopy(op.value)
+        elif op.op == 'remove':
+            del target[key]
+        elif op.op == 'replace':
+            if isinstance(target,
+                          MetadataMutableMappingNode) and (key not in target):
+                raise KeyError(key)
+            target[key] = copy.deepcopy(op.value)
+        else:
+            raise ValueError(f'Unknown operation "{op.op}".')
+    return node
@@ -0,0 +1,160 @@
+import collections
+import contextlib
+import functools
+import time
+from typing import Callable, Dict, Iterator, Union
+
+# the collector of the innermost active `instrument` block (if any); while
+# instrumentation is disabled, the instrumented code paths only check this
+# global
+_active: Union[None, "Instrumentation"] = None
+
+
+class Instrumentation:
+    """
+    Counters and timings collected by `instrument`.
+
+    Attributes:
+
+    - `counters (Counter)`: Event counts, e.g. `'nodes_created'` or
+      `'resolve.hit'`/`'resolve.miss'` (cached parameter resolutions).
+    - `lookup_depths (Counter)`: Histogram of the number of nodes walked by
+      uncached lookups of inherited parameters.
+    - `timings (dict)`: `{name: [seconds, calls]}` of timed operations, e.g.
+      `'from_yaml'`, `'yaml.load'` or `'yaml.dump'`.
+    """
+    __slots__ = ('counters', 'lookup_depths', 'timings')
+
+    def __init__(self):
+        self.counters = collections.Counter()
+        self.lookup_depths = collections.Counter()
+        self.timings: Dict[str, list] = {}
+
+    def add_time(self, name: str, seconds: float, calls: int = 1):
+        timing = self.timings.setdefault(name, [0.0, 0])
+        timing[0] += seconds
+        timing[1] += calls
+
+    def merge(self, other: "Instrumentation"):
+        """Adds the counters and timings of another collector."""
+        self.counters.update(other.counters)
+        self.lookup_depths.update(other.lookup_depths)
+        for name, (seconds, calls) in other.timings.items():
+            self.add_time(name, seconds, calls)
+
+    def report(self) -> dict:
+        """
+        Returns the collected data as a plain dictionary with the keys
+        `'counters'`, `'lookup_depths'` and `'timings'` (the latter with
+        `{'seconds': ..., 'calls': ...}` per operation).
+        """
+        return {
+            'counters': dict(self.counters),
+            'lookup_depths': dict(sorted(self.lookup_depths.items())),
+            'timings': {
+                name: {
+                    'seconds': seconds,
+                    'calls': calls
+                }
+                for name, (seconds, calls) in self.timings.items()
+            },
+        }
+
+
+@contextlib.contextmanager
+def instrument(
+    hook: Union[None, Callable[[dict],
+                               None]] = None) -> Iterator[Instrumentation]:
+    """
+    Context manager that collects counters and timings of the metadata
+    operations executed inside the block.
+
+    Instrumentation is disabled by default and costs a single global check
+    in the instrumented code paths. It is process-wide (not per thread).
+    Nested blocks add their data to the enclosing block on exit.
+
+    Args:
+
+    - `hook (callable)`: Called with the report (see
+      `Instrumentation.report`) when the block exits, e.g. to forward the
+      data to a metrics system.
+
+    Returns:
+
+    `Instrumentation`: The collected data (complete after the block).
+
+    Example:
+
+        with metalib.instrument() as stats:
+            meta = metalib.from_yaml('data.yaml')
+            ...
+        print(stats.report())
+    """
+    global _active
+    stats = Instrumentation()
+    outer = _active
+    _active = stats
+    try:
+        yield stats
+    finally:
+        _active = outer
+        if outer is not None:
+            outer.merge(stats)
+        if hook is not None:
+            hook(stats.report())
+
+
+class _Timer:
+    # times a block and adds the duration to the active collector
+    __slots__ = ('name', 'stats', 'start')
+
+    def __init__(self, name: str, stats: Instrumentation):
+        self.name = name
+        self.stats = stats
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.stats.add_time(self.name, time.perf_counter() - self.start)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def _timed(name: str):
+    # `with _timed('name'): ...` records the time of the block if
+    # instrumentation is enabled
+    if _active is None:
+        return _NULL_TIMER
+    return _Timer(name, _active)
+
+
+def _timed_function(name: str):
+    # decorator that records the time of each call of the function
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _timed(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _count(name: str, n: int = 1):
+    # increments a counter if instrumentation is enabled (hot paths check
+    # `_instrument._active` inline instead)
+    if _active is not None:
+        _active.counters[name] += n
@@ -1,13 +1,35 @@
-import inspect
-import io
+import asyncio
+import collections
+import contextlib
+import functools
+import glob
+import hashlib
+import itertools
+import os
+import re
 import subprocess
+import sys
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextvars import ContextVar
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Callable, Dict, Iterator, Tuple
 
+import numpy as np
 from ruamel.yaml import YAML
+from ruamel.yaml.comments import CommentedMap, CommentedSeq
+from ruamel.yaml.constructor import (BaseConstructor, RoundTripConstructor,
+                                     SafeConstructor)
+from ruamel.yaml.events import (DocumentStartEvent, MappingEndEvent,
+                                MappingStartEvent, SequenceEndEvent,
+                                SequenceStartEvent, StreamStartEvent)
+from ruamel.yaml.representer import RoundTripRepresenter
 from toolz import curry, pipe
 
 from .core import *
+from . import _instrument
+from ._cache import ParseCache, _file_state
 
 
 @curry
@@ -17,14 +39,184 @@ def _add_metadata_filename(filename: Path, node: MetadataNode):
     return node
 
 
+def _is_source_file(filename: Path, metadata: MetadataNode) -> bool:
+    # `metadata` is the whole tree loaded from `filename`
+    tree = metadata._tree
+    if metadata._parent is not None or tree.source_state is None:
+        return False
+    try:
+        return os.path.samefile(tree.path / tree.filename, filename)
+    except OSError:
+        return False  # e.g. the file was removed
+
+
+def _is_unchanged(filename: Path, metadata: MetadataNode) -> bool:
+    # the metadata was not modified since it was loaded from `filename` and
+    # the file was not changed on disk
+    return (not metadata._tree.dirty and _is_source_file(filename, metadata)
+            and _file_state(filename) == metadata._tree.source_state)
+
+
 @curry
 def _add_yaml_instance(yaml: YAML, node: MetadataNode):
     node._yaml_serializer = yaml
     return node
 
 
+# the metadata file that is currently loaded or saved; sidecar files of
+# large arrays are stored next to it
+_metadata_file: ContextVar[Union[None, Path]] = ContextVar('_metadata_file',
+                                                           default=None)
+
+
+@contextlib.contextmanager
+def _metadata_file_context(filename: Path):
+    token = _metadata_file.set(filename)
+    try:
+        yield
+    finally:
+        _metadata_file.reset(token)
+
+
+# tag of arrays stored in ".npy" sidecar files
+_SIDECAR_TAG = '!npy'
+
+# arrays with at least this number of elements are saved in sidecar files
+_SIDECAR_MIN_SIZE = 1024
+
+# sidecar file of the arrays loaded from sidecar files (by id of the array)
+_sidecar_files: Dict[int, Tuple[weakref.ref, Path]] = {}
+
+
+def _construct_sidecar(constructor: BaseConstructor, node) -> np.ndarray:
+    # open the sidecar file relative to the metadata file (memory mapped,
+    # the data is read on demand)
+    name = constructor.construct_scalar(node)
+    filename = _metadata_file.get()
+    path = Path(name) if filename is None else filename.parent / name
+    array = np.load(path, mmap_mode='r')
+
+    key = id(array)
+    _sidecar_files[key] = (weakref.ref(
+        array, lambda _: _sidecar_files.pop(key, None)), path)
+    return array
+
+
+# names of the sidecar files referenced by the metadata file that is
+# currently saved
+_referenced_sidecars: ContextVar[Union[None, set]] = ContextVar(
+    '_referenced_sidecars', default=None)
+
+
+def _is_own_sidecar(filename: Path, name: str) -> bool:
+    # sidecar files of a metadata file are named "<name>.<hash>.npy" (the
+    # full name, so that e.g. "run.yaml" and "run.yml" do not share them)
+    return re.fullmatch(
+        re.escape(filename.name) + r'\.[0-9a-f]{16}\.npy', name) is not None
+
+
+def _has_sidecars(filename: Path) -> bool:
+    # the (existing) metadata file may refer to sidecar files
+    try:
+        with open(filename, 'rb') as f:
+            return _SIDECAR_TAG.encode() in f.read()
+    except OSError:
+        return False
+
+
+def _write_sidecar(filename: Path, array: np.ndarray) -> str:
+    name = _sidecar_name(filename, array)
+    referenced = _referenced_sidecars.get()
+    if referenced is not None:
+        referenced.add(name)
+    return name
+
+
+def _sidecar_name(filename: Path, array: np.ndarray) -> str:
+    # unchanged arrays of sidecar files of the same metadata file are not
+    # written again (loaded arrays are read-only)
+    entry = _sidecar_files.get(id(array))
+    if entry is not None and entry[0]() is array:
+        path = entry[1]
+        if (path.parent.resolve() == filename.parent.resolve()
+                and _is_own_sidecar(filename, path.name) and path.exists()):
+            return path.name
+
+    # the name of the sidecar file is derived from its contents, so that
+    # existing files (which may be memory mapped) are never overwritten
+    digest = hashlib.sha1(f'{array.dtype.str}{array.shape}'.encode())
+    digest.update(np.ascontiguousarray(array).data)
+    path = filename.parent / f'{filename.name}.{digest.hexdigest()[:16]}.npy'
+    if not path.exists():
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp, path)
+    return path.name
+
+
+def _remove_unused_sidecars(filename: Path, referenced: set):
+    # removes the sidecar files of the metadata file that it no longer
+    # refers to (e.g. the previous version of a modified array)
+    for path in filename.parent.glob(glob.escape(filename.name) + '.*.npy'):
+        if path.name not in referenced and _is_own_sidecar(
+                filename, path.name):
+            try:
+                path.unlink()
+            except OSError:
+                pass  # e.g. still memory mapped on Windows
+
+
+# containers that are shared after interning (see `from_obj`); they are
+# written in full at each place instead of as YAML aliases
+_shared_containers: ContextVar[Union[None,
+                                     dict]] = ContextVar('_shared_containers',
+                                                         default=None)
+
+
+class _MetadataRepresenter(RoundTripRepresenter):
+    # round-trip representer with support for the values of metadata nodes
+    def ignore_aliases(self, data: Any) -> bool:
+        shared = _shared_containers.get()
+        if shared is not None and id(data) in shared:
+            return True
+        return super().ignore_aliases(data)
+
+
+def _represent_array(representer: RoundTripRepresenter, array: np.ndarray):
+    filename = _metadata_file.get()
+    if (filename is not None and not array.dtype.hasobject and
+        (array.size >= _SIDECAR_MIN_SIZE or id(array) in _sidecar_files)):
+        # large arrays are saved in sidecar files
+        return representer.represent_scalar(_SIDECAR_TAG,
+                                            _write_sidecar(filename, array))
+
+    # small arrays are saved as compact (flow style) lists
+    return representer.represent_sequence('tag:yaml.org,2002:seq',
+                                          array.tolist(),
+                                          flow_style=True)
+
+
+_MetadataRepresenter.add_representer(np.ndarray, _represent_array)
+_MetadataRepresenter.add_representer(np.memmap, _represent_array)
+
+
+class _MetadataConstructor(RoundTripConstructor):
+    pass
+
+
+class _MetadataSafeConstructor(SafeConstructor):
+    pass
+
+
+_MetadataConstructor.add_constructor(_SIDECAR_TAG, _construct_sidecar)
+_MetadataSafeConstructor.add_constructor(_SIDECAR_TAG, _construct_sidecar)
+
+
 def _create_yaml_serializer() -> YAML:
     yaml = YAML()
+    yaml.Constructor = _MetadataConstructor
+    yaml.Representer = _MetadataRepresenter
     yaml.encoding = 'utf-8'
     yaml.allow_unicode = True
     yaml.indent(mapping=2, sequence=4, offset=2)
@@ -32,90 +224,621 @@ def _create_yaml_serializer() -> YAML:
     return yaml
 
 
-def from_yaml(filename: Union[str, Path]) -> MetadataNode:
+def _create_yaml_loader(mode: str) -> YAML:
+    if mode == 'roundtrip':
+        return _create_yaml_serializer()
+    elif mode == 'fast':
+        # safe loader (uses the C extension if available)
+        yaml = YAML(typ='safe', pure=False)
+        yaml.Constructor = _MetadataSafeConstructor
+        return yaml
+    else:
+        raise ValueError('"mode" must be "roundtrip" or "fast".')
+
+
+def _timed_parser(yaml: YAML) -> Callable[[str], Any]:
+    def parse(text: str) -> Any:
+        with _instrument._timed('yaml.load'):
+            return yaml.load(text)
+
+    return parse
+
+
+@_instrument._timed_function('from_yaml')
+def from_yaml(filename: Union[str, Path],
+              mode: str = 'roundtrip',
+              cache: Union[None, str, Path, ParseCache] = None,
+              arrays: bool = False,
+              intern: bool = False) -> MetadataNode:
+    """
+    Loads metadata from a YAML file.
+
+    Args:
+
+    - `filename (str, Path)`: The name of the file.
+    - `mode (str)`: `'roundtrip'` preserves comments and formatting of the
+      file when the metadata is saved again (see `to_yaml`). `'fast'` uses
+      the (C-accelerated) safe loader, which creates plain dictionaries and
+      lists and is considerably faster; use it for read-only access.
+    - `cache (str, Path, ParseCache)`: A parse cache or its directory. If
+      given, the parsed file is stored in (or taken from) the cache, which
+      skips parsing until the file is modified.
+    - `arrays (bool)`: Store lists of numbers in NumPy arrays (see
+      `from_obj`). Arrays are saved as flow style lists.
+    - `intern (bool)`: Share identical subtrees and intern keys and values
+      (see `from_obj`). Only plain dicts and lists are shared, so this is
+      most effective in `'fast'` mode.
+
+    Returns:
+
+    `MetadataNode`: The metadata structure.
+    """
     if not isinstance(filename, Path):
         filename = Path(filename)
 
-    yaml = _create_yaml_serializer()
-
-    return pipe(
-        filename.read_text(),
-        yaml.load,
-        from_obj,
+    yaml = _create_yaml_loader(mode)
+    parse = _timed_parser(yaml)
+    state = _file_state(filename)
+    with _metadata_file_context(filename):
+        if cache is None:
+            obj = parse(filename.read_text())
+        else:
+            if not isinstance(cache, ParseCache):
+                cache = ParseCache(cache)
+            obj = cache.load(filename, mode, parse)
+
+    node = pipe(
+        obj,
+        functools.partial(from_obj, arrays=arrays, intern=intern),
         _add_metadata_filename(filename),
-        _add_yaml_instance(yaml),
     )
+    node._tree.source_state = state
+    if mode == 'roundtrip':
+        # reuse the serializer to preserve the formatting on save
+        _add_yaml_instance(yaml, node)
+    return node
+
+
+def _compose_next(yaml: YAML, filename: Path) -> Any:
+    # compose and construct the next node of the event stream
+    with _metadata_file_context(filename):
+        node = yaml.composer.compose_node(None, None)
+        return yaml.constructor.construct_document(node)
+
+
+def _expect_event(yaml: YAML, event_type: type, message: str):
+    event = yaml.parser.get_event()
+    if not isinstance(event, event_type):
+        raise ValueError(f'{message} (line {event.start_mark.line + 1}).')
+
+
+def iter_yaml(filename: Union[str, Path],
+              key: Union[None, str] = 'params') -> Iterator[MetadataNode]:
+    """
+    Iterates over the entries of a (huge) list in a YAML file without
+    loading the whole file. The entries are parsed one at a time, so the
+    memory usage is bounded by the size of a single entry.
+
+    Args:
+
+    - `filename (str, Path)`: The name of the file.
+    - `key (str)`: The key of the list in the top-level mapping of the
+      file. If `None`, the file must contain a top-level list.
+
+    Returns:
+
+    `Iterator[MetadataNode]`: The list entries (parsed with the safe loader
+    of the `'fast'` mode). The entries are children of a mapping node with
+    the keys that precede the list in the file, so these parameters are
+    inherited by the entries.
+    """
+    if not isinstance(filename, Path):
+        filename = Path(filename)
+
+    # the pure python parser gives access to the event stream
+    yaml = YAML(typ='safe', pure=True)
+    yaml.Constructor = _MetadataSafeConstructor
+    with filename.open('r', encoding='utf-8') as stream:
+        yaml.get_constructor_parser(stream)
+        _expect_event(yaml, StreamStartEvent, 'Expected a YAML stream')
+        _expect_event(yaml, DocumentStartEvent, 'Expected a YAML document')
+
+        parent = None
+        if key is not None:
+            _expect_event(yaml, MappingStartEvent,
+                          'Expected a mapping at the top level')
+            # collect the preceding parameters of the top-level mapping
+            params = {}
+            while not yaml.parser.check_event(MappingEndEvent):
+                name = _compose_next(yaml, filename)
+                if name == key:
+                    break
+                params[name] = _compose_next(yaml, filename)
+            else:
+                raise KeyError(key)
+            parent = MetadataMutableMappingNode(None, params)
+            _add_metadata_filename(filename, parent)
+
+        _expect_event(yaml, SequenceStartEvent, 'Expected a list')
+        while not yaml.parser.check_event(SequenceEndEvent):
+            node = MetadataNode._transform_value(parent,
+                                                 _compose_next(yaml, filename))
+            if parent is None:
+                _add_metadata_filename(filename, node)
+            yield node
+
+
+class MetadataLoadError(Exception):
+    """
+    Raised by `load_many` if some of the files could not be loaded.
+
+    Attributes:
+
+    - `errors (dict)`: Error message per file path.
+    - `results (list)`: The metadata of the files that could be loaded.
+    """
+    def __init__(self, errors: Dict[Path, str], results: List[MetadataNode]):
+        lines = [f'{path}: {message}' for path, message in errors.items()]
+        super().__init__(f'Could not load {len(errors)} metadata file(s):\n' +
+                         '\n'.join(lines))
+        self.errors = errors
+        self.results = results
+
+
+def _expand_paths(
+        paths_or_glob: Union[str, Path, Iterable[Union[str,
+                                                       Path]]]) -> List[Path]:
+    if isinstance(paths_or_glob, (str, Path)):
+        if Path(paths_or_glob).is_dir():
+            # all YAML files in the directory
+            directory = Path(paths_or_glob)
+            return sorted(
+                [*directory.glob('*.yaml'), *directory.glob('*.yml')])
+        else:
+            # glob pattern (or a single file name)
+            return [
+                Path(path) for path in sorted(
+                    glob.glob(str(paths_or_glob), recursive=True))
+            ]
+    else:
+        return [Path(path) for path in paths_or_glob]
+
+
+def _parse_yaml_file(
+        filename: Path, mode: str
+) -> Tuple[Any, Union[None, Tuple[int, int]], Union[None, str]]:
+    # runs in a worker process: parse the file into python objects, which
+    # are sent back to the parent process (with the state of the file)
+    try:
+        state = _file_state(filename)
+        with _metadata_file_context(filename):
+            obj = _create_yaml_loader(mode).load(filename.read_text())
+        return obj, state, None
+    except Exception as e:
+        return None, None, f'{type(e).__name__}: {e}'
+
+
+def load_many(
+    paths_or_glob: Union[str, Path, Iterable[Union[str, Path]]],
+    workers: Union[None, int] = None,
+    errors: str = 'raise',
+    mode: str = 'fast',
+) -> List[MetadataNode]:
+    """
+    Loads many metadata files; the files are parsed in parallel in a pool
+    of worker processes.
+
+    Args:
+
+    - `paths_or_glob`: A list of file names, a glob pattern (e.g.
+      `'data/**/*.yaml'`) or a directory (all `*.yaml`/`*.yml` files in it).
+    - `workers (int)`: Number of worker processes (default: number of CPUs).
+      With a single worker, the files are parsed in the current process.
+    - `errors (str)`: `'raise'` raises a `MetadataLoadError` listing the
+      files that could not be loaded (after all files have been processed),
+      `'skip'` leaves these files out of the result.
+    - `mode (str)`: The load mode (see `from_yaml`). In the default `'fast'`
+      mode, the workers send back plain dictionaries and lists, which are
+      cheap to transfer; comments and formatting of the files are not
+      preserved when the metadata is saved again.
+
+    Returns:
+
+    `List[MetadataNode]`: The metadata of the files (in the order of the
+    file names).
+    """
+    if errors not in ('raise', 'skip'):
+        raise ValueError('"errors" must be "raise" or "skip".')
+    _create_yaml_loader(mode)  # validate mode
+
+    parse = functools.partial(_parse_yaml_file, mode=mode)
+    filenames = _expand_paths(paths_or_glob)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(filenames)))
+
+    if workers == 1:
+        parsed = map(parse, filenames)
+        return _build_metadata(filenames, parsed, errors, mode)
+    else:
+        chunksize = max(1, len(filenames) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parsed = executor.map(parse, filenames, chunksize=chunksize)
+            return _build_metadata(filenames, parsed, errors, mode)
+
+
+def _build_metadata(
+    filenames: List[Path],
+    parsed: Iterable[Tuple[Any, Union[None, Tuple[int, int]], Union[None,
+                                                                    str]]],
+    errors: str,
+    mode: str,
+) -> List[MetadataNode]:
+    # build the metadata trees in the parent process
+    results = []
+    failed = {}
+    for filename, (obj, state, message) in zip(filenames, parsed):
+        if message is None:
+            try:
+                node = _add_metadata_filename(filename, from_obj(obj))
+            except ValueError as e:
+                message = f'{type(e).__name__}: {e}'
+            else:
+                node._tree.source_state = state
+                if mode == 'roundtrip':
+                    _add_yaml_instance(_create_yaml_serializer(), node)
+                results.append(node)
+                continue
+        failed[filename] = message
+
+    if failed and errors == 'raise':
+        raise MetadataLoadError(failed, results)
+    return results
+
+
+def _load_documents(filename: Path, mode: str) -> List[MetadataNode]:
+    # load all documents of a (multi-document) YAML file
+    yaml = _create_yaml_loader(mode)
+    documents = []
+    with _metadata_file_context(filename):
+        objs = list(yaml.load_all(filename.read_text()))
+    for obj in objs:
+        if obj is None:
+            continue  # empty document
+        node = _add_metadata_filename(filename, from_obj(obj))
+        if mode == 'roundtrip':
+            _add_yaml_instance(_create_yaml_serializer(), node)
+        documents.append(node)
+    return documents
+
+
+class MetadataScan:
+    """
+    Streams the documents of many metadata files (see `scan`).
+    """
+    def __init__(self, filenames: List[Path], mode: str, prefetch: int):
+        self.filenames = filenames
+        self.mode = mode
+        self.prefetch = prefetch
+
+    def __iter__(self) -> Iterator[MetadataNode]:
+        load = functools.partial(_load_documents, mode=self.mode)
+        if self.prefetch < 1:
+            for filename in self.filenames:
+                yield from load(filename)
+            return
+
+        # load the next files in background threads while the documents of
+        # the current file are processed
+        filenames = iter(self.filenames)
+        with ThreadPoolExecutor(max_workers=self.prefetch) as executor:
+            pending = collections.deque(
+                executor.submit(load, filename)
+                for filename in itertools.islice(filenames, self.prefetch))
+            try:
+                while pending:
+                    documents = pending.popleft().result()
+                    for filename in itertools.islice(filenames, 1):
+                        pending.append(executor.submit(load, filename))
+                    yield from documents
+                    del documents
+            finally:
+                # the iteration was stopped early
+                for future in pending:
+                    future.cancel()
+
+    def query(
+        self,
+        predicate: Union[None, Callable[[MetadataNode], bool]] = None,
+        **kwargs,
+    ) -> Iterator[MetadataNode]:
+        """
+        Returns an iterator over the matching nodes of all documents (see
+        `MetadataNode.query` for the arguments). The documents are loaded
+        one after the other and are released once they have been searched
+        (unless a matching node is kept).
+        """
+        for document in self:
+            yield from document.query(predicate, **kwargs)
+
+    def first(
+        self,
+        predicate: Union[None, Callable[[MetadataNode], bool]] = None,
+        **kwargs,
+    ) -> MetadataNode:
+        """
+        Returns the first node matching the given conditions (see `query`).
+        """
+        try:
+            return next(self.query(predicate, **kwargs))
+        except StopIteration:
+            raise RuntimeError('No metadata matches the given predicate.')
+
+
+def scan(paths_or_glob: Union[str, Path, Iterable[Union[str, Path]]],
+         mode: str = 'fast',
+         prefetch: int = 2) -> MetadataScan:
+    """
+    Streams the documents of many metadata files without loading all files
+    at once, e.g. `metalib.scan('data/**/*.yaml').query(predicate)`. Files
+    with several YAML documents (separated by `---`) yield one metadata
+    structure per document.
+
+    Args:
+
+    - `paths_or_glob`: A list of file names, a glob pattern or a directory
+      (see `load_many`).
+    - `mode (str)`: The load mode (see `from_yaml`).
+    - `prefetch (int)`: Number of files that are loaded ahead in background
+      threads. With `0`, the files are loaded on demand.
+
+    Returns:
+
+    `MetadataScan`: An iterable over the documents, which can be queried
+    with `query` and `first`.
+    """
+    _create_yaml_loader(mode)  # validate mode
+    return MetadataScan(_expand_paths(paths_or_glob), mode, prefetch)
+
+
+# frames in these directories are skipped when looking for the caller
+_SKIPPED_DIRECTORIES = (
+    os.path.dirname(os.path.abspath(__file__)),  # metalib
+    os.path.dirname(asyncio.__file__),  # event loop of coroutines
+)
 
 
 def _get_caller_filepath() -> Path:
-    # get the caller's stack frame and extract its file path
-    # (we take the first stack frame outside the "_yaml.py" module
-    # and outside of the installed packages in the "site-packages" folder)
-    frame_info = next(frame for frame in inspect.stack()
-                      if not frame.filename.endswith('_yaml.py')
-                      and 'site-packages' not in frame.filename)
-    filepath = frame_info.filename
-    del frame_info  # drop the reference to the stack frame to avoid reference cycles
+    # walk up the stack and take the first frame outside of metalib and
+    # outside of the installed packages in the "site-packages" folder
+    # (without collecting the source context of all frames)
+    frame = sys._getframe(1)
+    try:
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if not (filename.startswith(_SKIPPED_DIRECTORIES)
+                    or 'site-packages' in filename):
+                return Path(filename)
+            frame = frame.f_back
+    finally:
+        del frame  # drop the reference to the stack frame to avoid reference cycles
+    return Path(filename)
+
+
+def _find_git_dir(directory: Path) -> Union[None, Path]:
+    for parent in (directory, *directory.parents):
+        git = parent / '.git'
+        if git.is_dir():
+            return git
+        elif git.is_file():
+            # worktrees and submodules: ".git" refers to the git directory
+            text = git.read_text().strip()
+            if text.startswith('gitdir:'):
+                return (parent / text[len('gitdir:'):].strip()).resolve()
+    return None
+
+
+def _git_state(directory: Path) -> Tuple:
+    # The state of the repository changes with the checked out commit
+    # (HEAD and the branch it refers to) and with the index. Changes of the
+    # working tree are detected by the states of the tracked files (see
+    # `_cached_git_label`).
+    git_dir = _find_git_dir(directory)
+    if git_dir is None:
+        return ()
+    try:
+        head = (git_dir / 'HEAD').read_text().strip()
+    except OSError:
+        head = None
+    ref = None
+    if head is not None and head.startswith('ref:'):
+        ref = (_file_state(git_dir / head[len('ref:'):].strip()),
+               _file_state(git_dir / 'packed-refs'))
+    return head, ref, _file_state(git_dir / 'index')
+
+
+def _parse_tracked_files(toplevel: Union[None, str],
+                         names: Union[None, str]) -> Tuple[Path, ...]:
+    # output of `git rev-parse --show-toplevel` and `git ls-files -z`
+    if not toplevel or names is None:
+        return ()
+    return tuple(
+        Path(toplevel.strip()) / name for name in names.split('\0') if name)
+
+
+def _git_output(*args: str, cwd: Union[None, str] = None) -> Union[None, str]:
+    try:
+        return subprocess.check_output(['git', *args],
+                                       cwd=cwd,
+                                       stderr=subprocess.DEVNULL,
+                                       text=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _tracked_files() -> Tuple[Path, ...]:
+    toplevel = _git_output('rev-parse', '--show-toplevel')
+    if not toplevel:
+        return ()
+    return _parse_tracked_files(
+        toplevel, _git_output('ls-files', '-z', cwd=toplevel.strip()))
+
+
+# git label per working directory: {directory: (repository state, tracked
+# files, states of the tracked files, label)}
+_git_commit_cache: Dict[Path, Tuple[Tuple, Tuple[Path, ...], Tuple,
+                                    Union[None, str]]] = {}
 
-    # make the path absolute (optional)
-    return Path(filepath)  #.resolve()
+
+def _cached_git_label(directory: Path,
+                      state: Tuple) -> Tuple[bool, Union[None, str]]:
+    # Returns `(True, label)` if the cached label of the directory is up to
+    # date. The "-dirty" suffix changes with the tracked files of the
+    # working tree, which are not in the index until they are staged.
+    cached = _git_commit_cache.get(directory)
+    if cached is None or cached[0] != state:
+        return False, None
+    _, files, file_states, label = cached
+    if tuple(map(_file_state, files)) != file_states:
+        return False, None
+    return True, label
 
 
 def _get_git_commit_hash() -> Union[str, None]:
+    directory = Path.cwd()
+    state = _git_state(directory)
+    hit, label = _cached_git_label(directory, state)
+    if hit:
+        return label
+
+    # the states of the tracked files are taken before `git describe`, so
+    # that concurrent modifications are detected by the next call
+    files = _tracked_files() if state else ()
+    file_states = tuple(map(_file_state, files))
     try:
         label = subprocess.check_output(
             ["git", "describe", "--always", "--dirty"], text=True).strip()
-        return str(label)
+        label = str(label)
     except:
-        return None
+        label = None
+    _git_commit_cache[directory] = (state, files, file_states, label)
+    return label
 
 
-@curry
-def _append_history(
-    origin: Union[Path, str],
-    description: Union[None, Iterable[str]],
-    node: MetadataNode,
-):
-    if not isinstance(node, MetadataMutableMappingNode):
-        return node
+class Provenance:
+    """
+    Provenance information that is added to the history of saved metadata.
+
+    Args:
 
-    if '$history' not in node:
-        node['$history'] = []
+    - `script (str)`: The name of the script that saves the metadata.
+    - `git_commit (str)`: The git label of the working directory (see
+      `git describe --always --dirty`).
 
+    Use `Provenance.capture()` once and pass the result to `to_yaml` when
+    saving many files from the same script.
+    """
+    __slots__ = ('script', 'git_commit')
+
+    def __init__(self,
+                 script: Union[None, str] = None,
+                 git_commit: Union[None, str] = None):
+        self.script = script
+        self.git_commit = git_commit
+
+    @classmethod
+    def capture(cls) -> 'Provenance':
+        """
+        Captures the provenance of the calling script. The git label is
+        cached per process and working directory until the repository
+        state changes (checked out commit, index or the modification times
+        of the tracked files). The "-dirty" suffix may be stale if a
+        tracked file is modified without changing its modification time
+        and size, or if a new file is staged directly in the index file.
+        """
+        return cls(_get_caller_filepath().name, _get_git_commit_hash())
+
+    def __repr__(self):
+        return f'Provenance(script={self.script!r}, git_commit={self.git_commit!r})'
+
+
+def _create_history_entry(
+    origin: Union[Path, str],
+    description: Union[None, Iterable[str]],
+    provenance: Provenance,
+) -> dict:
     entry = {
         '$date': datetime.now(),
-        '$script': _get_caller_filepath().name,
-        '$git-commit': _get_git_commit_hash()
+        '$script': provenance.script,
+        '$git-commit': provenance.git_commit
     }
     if origin:
         entry['$origin'] = str(origin)
     if description:
         entry['$description'] = list(description)
-    node['$history'].append(entry)
-
-    return node
-
-
-@curry
-def _memory_roundtrip(yaml: YAML, node: MetadataNode):
-    stream = io.StringIO()
-
-    # dump yaml to memory
-    yaml.dump(node._ref, stream)
-
-    # reload yaml from memory
-    stream.seek(0)
-    return pipe(
-        yaml.load(stream),
-        from_obj,
-    )
-
-
+    return entry
+
+
+def _copy_container(obj: Union[list, dict]) -> Union[list, dict]:
+    # shallow copy including comments, formatting and anchors
+    # of the ruamel.yaml containers
+    if isinstance(obj, CommentedMap):
+        return obj.copy()
+    elif isinstance(obj, CommentedSeq):
+        return obj.copy_attributes(CommentedSeq(obj))
+    else:
+        return type(obj)(obj)
+
+
+def _with_history(ref: Any, entry: dict) -> Any:
+    # Returns a shallow overlay of the document with the history entry
+    # appended. Only the document root and the history list are copied, all
+    # other objects are shared with (and not modified in) the original.
+    if not isinstance(ref, dict):
+        return ref
+
+    ref = _copy_container(ref)
+    if '$history' in ref:
+        history = _copy_container(ref['$history'])
+    else:
+        history = []
+    history.append(entry)
+    ref['$history'] = history
+    return ref
+
+
+@_instrument._timed_function('to_yaml')
 def to_yaml(filename: Union[str, Path],
             metadata: MetadataNode,
-            description: Union[None, str, Iterable[str]] = None):
-
+            description: Union[None, str, Iterable[str]] = None,
+            provenance: Union[None, Provenance] = None,
+            only_if_changed: bool = False) -> bool:
+    """
+    Saves metadata to a YAML file and appends an entry to its `$history`
+    (the metadata itself is not modified).
+
+    Args:
+
+    - `filename (str, Path)`: The name of the file.
+    - `metadata (MetadataNode)`: The metadata to save.
+    - `description (str, list)`: Description(s) added to the history entry.
+    - `provenance (Provenance)`: The script and git label added to the
+      history entry. Captured from the caller if not given.
+    - `only_if_changed (bool)`: Skip the write (and the history entry) if
+      `metadata` was loaded from `filename` (see `from_yaml` and
+      `load_many`), has not been modified through the node methods since
+      and the file has not changed on disk. Changes made directly to the
+      underlying containers are not detected.
+
+    Returns:
+
+    `bool`: `True` if the file was written.
+    """
     filename = Path(filename)
+    if only_if_changed and _is_unchanged(filename, metadata):
+        _instrument._count('to_yaml.skipped')
+        return False
+
     try:
         origin = metadata._filename
     except AttributeError:
@@ -133,22 +856,27 @@ def to_yaml(filename: Union[str, Path],
     if isinstance(description, str):
         description = [description]
 
-    pipe(
-        metadata,
-        # clone metadata in memory
-        _memory_roundtrip(yaml),
-        # add history only to clone to avoid modifying the original metadata
-        _append_history(origin, description),
-        # dump metadata to file
-        lambda meta: yaml.dump(meta._ref, filename),
-    )
-
-
-def _to_yaml(self: MetadataNode,
-             filename: Union[str, Path],
-             description: Union[None, str, Iterable[str]] = None):
-    to_yaml(filename, self, description)
-
-
-# add to_yaml convenience method to class
-MetadataNode.to_yaml = _to_yaml
+    # add history to an overlay to avoid modifying the original metadata
+    if provenance is None:
+        provenance = Provenance.capture()
+    entry = _create_history_entry(origin, description, provenance)
+    # sidecar files are only cleaned up if the file refers (or referred) to
+    # any, so saving plain metadata does not scan the directory
+    had_sidecars = _has_sidecars(filename)
+    referenced = set()
+    token = _shared_containers.set(metadata._tree.shared)
+    sidecars_token = _referenced_sidecars.set(referenced)
+    try:
+        with _metadata_file_context(filename), _instrument._timed('yaml.dump'):
+            yaml.dump(_with_history(metadata._ref, entry), filename)
+    finally:
+        _shared_containers.reset(token)
+        _referenced_sidecars.reset(sidecars_token)
+    if referenced or had_sidecars:
+        _remove_unused_sidecars(filename, referenced)
+
+    if _is_source_file(filename, metadata):
+        # the file holds the metadata again (plus the new history entry)
+        metadata._tree.dirty = False
+        metadata._tree.source_state = _file_state(filename)
+    return True
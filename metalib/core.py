@@ -1,24 +1,355 @@
 import collections.abc
+import hashlib
 import numbers
+import operator
+import sys
 from abc import ABCMeta, abstractmethod
-from typing import (Any, Callable, Iterable, Iterator, List, MutableMapping,
-                    MutableSequence, Union, overload)
+from datetime import date, datetime
+from pathlib import Path
+from typing import (TYPE_CHECKING, Any, Callable, Iterable, Iterator, List,
+                    Mapping, MutableMapping, MutableSequence, Tuple, Union,
+                    overload)
+
+from . import _instrument
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class _MetadataTree:
+    """
+    State shared by all nodes of a metadata tree.
+
+    Attributes that belong to the tree as a whole (e.g. the name of the file
+    it was loaded from) are stored here instead of on the root node, so that
+    nodes can use `__slots__` and every node reports the same values.
+    """
+    __slots__ = ('filename', 'path', 'yaml_serializer', 'epoch', 'index',
+                 'shared', 'dirty', 'source_state')
+
+    def __init__(self):
+        self.filename = None
+        self.path = None
+        self.yaml_serializer = None
+
+        # incremented whenever a key is added to or removed from a mapping
+        # of the tree, which invalidates all cached parameter resolutions
+        self.epoch = 0
+
+        # key index used by structured queries (built on demand)
+        self.index: Union[None, _KeyIndex] = None
+
+        # containers referenced from several places of the tree after
+        # interning, `{id(obj): obj}` (copied on write)
+        self.shared: Union[None, dict] = None
+
+        # set when a node of the tree is modified through its methods
+        self.dirty = False
+
+        # `(mtime, size)` of the file the tree was loaded from (before
+        # parsing); `None` if the tree does not mirror a whole file
+        self.source_state: Union[None, Tuple[int, int]] = None
+
+
+class _KeyIndex:
+    """
+    Inverted index of the keys and (key, value) pairs defined by the
+    mapping nodes of a metadata tree.
+
+    Nodes are stored in dictionaries keyed by `id(node)`, because mapping
+    nodes are not hashable. Subtrees that belong to another tree (e.g. nodes
+    that were assigned to a key) are not indexed, but recorded in `foreign`
+    together with the node they are attached to.
+    """
+    __slots__ = ('tree', 'keys', 'items', 'foreign')
+
+    def __init__(self, tree: _MetadataTree):
+        self.tree = tree
+        self.keys: dict = {}
+        self.items: dict = {}
+        self.foreign: dict = {}
+
+    @staticmethod
+    def _add(table: dict, entry: Any, node: "MetadataNode") -> None:
+        try:
+            nodes = table[entry]
+        except KeyError:
+            nodes = table[entry] = {}
+        except TypeError:
+            # unhashable value
+            return
+        nodes[id(node)] = node
+
+    @staticmethod
+    def _remove(table: dict, entry: Any, node: "MetadataNode") -> None:
+        try:
+            nodes = table[entry]
+        except (KeyError, TypeError):
+            return
+        nodes.pop(id(node), None)
+        if not nodes:
+            del table[entry]
+
+    def add_subtree(
+        self,
+        node: "MetadataNode",
+        container: Union[None, "MetadataNode"] = None,
+    ) -> None:
+        stack = [(container, node)]
+        while stack:
+            container, node = stack.pop()
+            if node._tree is not self.tree:
+                # remember where the foreign tree is attached
+                self.foreign[id(node)] = (container, node)
+                continue
+            if isinstance(node, MetadataMutableMappingNode):
+                for key, value in node._ref.items():
+                    self._add(self.keys, key, node)
+                    if not _is_collection(value):
+                        self._add(self.items, (key, _scalar_value(value)),
+                                  node)
+            stack.extend((node, child) for child in node._iter_nodes_())
+
+    def remove_subtree(self, node: "MetadataNode") -> None:
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node._tree is not self.tree:
+                self.foreign.pop(id(node), None)
+                continue
+            if isinstance(node, MetadataMutableMappingNode):
+                for key, value in node._ref.items():
+                    self._remove(self.keys, key, node)
+                    if not _is_collection(value):
+                        self._remove(self.items, (key, _scalar_value(value)),
+                                     node)
+            # only materialized nodes can be part of the index
+            stack.extend(node._materialized_nodes_())
+
+    def add_child(self, node: "MetadataCollectionNode", key: Any) -> None:
+        # index the value stored at `node._ref[key]`
+        value = node._ref[key]
+        if _is_collection(value):
+            self.add_subtree(node._child_node_(key), node)
+        if isinstance(node, MetadataMutableMappingNode):
+            self._add(self.keys, key, node)
+            if not _is_collection(value):
+                self._add(self.items, (key, _scalar_value(value)), node)
+
+    def remove_child(self, node: "MetadataCollectionNode", key: Any) -> None:
+        # remove the value stored at `node._ref[key]` from the index
+        value = node._ref[key]
+        if _is_collection(value):
+            self.remove_subtree(node._child_node_(key))
+        if isinstance(node, MetadataMutableMappingNode):
+            self._remove(self.keys, key, node)
+            if not _is_collection(value):
+                self._remove(self.items, (key, _scalar_value(value)), node)
+
+    def candidates(self, where: dict, has: Iterable[Any]) -> dict:
+        """
+        Returns the nodes that may match the given `where` and `has`
+        conditions as `{id(node): node}` (a superset of the matches).
+
+        Raises:
+
+        - `ValueError`: Neither `where` nor `has` conditions are given.
+        """
+        has = list(has)
+        if not where and not has:
+            raise ValueError('At least one condition is required.')
+
+        # nodes defining one of the `where` parameters (use the most
+        # selective condition)
+        key = None
+        nodes: Union[None, dict] = None
+        for name, value in where.items():
+            try:
+                definers = self.items.get((name, value), {})
+            except TypeError:
+                # unhashable value: use all nodes defining the key
+                definers = self.keys.get(name, {})
+            if nodes is None or len(definers) < len(nodes):
+                key, nodes = name, definers
+
+        sets = sorted((self.keys.get(name, {}) for name in has), key=len)
+        if sets and (nodes is None or len(sets[0]) <= len(nodes)):
+            # nodes defining all keys in `has`
+            return {
+                k: node
+                for k, node in sets[0].items()
+                if all(k in other for other in sets[1:])
+            }
+
+        # nodes defining the `where` parameter plus all nodes inheriting it
+        result = {}
+        stack = list(nodes.values())
+        while stack:
+            node = stack.pop()
+            result[id(node)] = node
+            if node._tree is not self.tree:
+                continue
+            for child in node._iter_nodes_():
+                if not child._defines_(key):
+                    stack.append(child)
+        return result
+
+
+def _tree_attribute(name: str) -> property:
+    # expose an attribute of the shared tree state on every node
+    # (unset attributes raise AttributeError like missing parameters)
+    def getter(self: "MetadataNode") -> Any:
+        value = getattr(self._tree, name)
+        if value is None:
+            raise AttributeError(f'_{name}')
+        return value
+
+    def setter(self: "MetadataNode", value: Any) -> None:
+        setattr(self._tree, name, value)
+
+    return property(getter, setter)
+
+
+# types that are never wrapped in collection nodes (fast path)
+_SCALAR_TYPES = frozenset(
+    (str, bytes, int, float, complex, bool, type(None), date, datetime))
+
+
+def _is_collection(value: Any) -> bool:
+    # mirrors `MetadataNode._transform_value` without creating a node
+    cls = type(value)
+    if cls is dict or cls is list:
+        return True
+    elif cls in _SCALAR_TYPES:
+        return False
+    elif isinstance(value, MetadataNode):
+        return isinstance(value, MetadataCollectionNode)
+    return isinstance(
+        value,
+        (collections.abc.MutableMapping, collections.abc.MutableSequence))
+
+
+def _is_array(value: Any) -> bool:
+    # NumPy is imported on first use (it dominates the import time of the
+    # package); an array can only exist once NumPy was imported
+    numpy = sys.modules.get('numpy')
+    return numpy is not None and isinstance(value, numpy.ndarray)
+
+
+def _is_node_value(value: Any) -> bool:
+    # values that are wrapped in a node on access (collections and arrays)
+    return _is_collection(value) or _is_array(value)
+
+
+def _truth(value: Any) -> bool:
+    # truth value of a comparison or predicate result; the vectorized
+    # comparisons of array nodes are true if they hold for all elements
+    if _is_array(value):
+        return bool(value.all())
+    return bool(value)
+
+
+def _scalar_value(value: Any) -> Any:
+    # scalars are stored unwrapped, but may have been assigned as node
+    if type(value) in _SCALAR_TYPES:
+        return value
+    elif isinstance(value, MetadataScalarNode):
+        return value._ref
+    return value
+
+
+_iter_nodes = operator.methodcaller('_iter_nodes_')
+
+
+def _is_boolean(value: Any) -> bool:
+    # booleans of other libraries: anchored booleans of the round-trip
+    # loader (an `int` subclass) and NumPy booleans
+    scalarbool = sys.modules.get('ruamel.yaml.scalarbool')
+    if scalarbool is not None and isinstance(value, scalarbool.ScalarBoolean):
+        return True
+    numpy = sys.modules.get('numpy')
+    return numpy is not None and isinstance(value, numpy.bool_)
+
+
+def _digest_token(value: Any) -> str:
+    # Unambiguous text representation of a scalar for content hashes.
+    # Booleans, integers and floats have different tokens, so a change from
+    # `1` to `1.0` or `true` changes the digest; subclasses (e.g. the
+    # scalars of the round-trip loader) have the token of their base type.
+    # Strings and other values are escaped by `repr`, so tokens never
+    # contain the separators used in `_hash_tokens`.
+    cls = type(value)
+    if cls is str:
+        return 's' + repr(value)
+    elif cls is int:
+        return f'i{value}'
+    elif cls is bool:
+        return 'b1' if value else 'b0'
+    elif cls is float:
+        return 'f' + repr(value)
+    elif value is None:
+        return 'n'
+    elif isinstance(value, str):
+        return 's' + repr(str(value))
+    elif _is_boolean(value):
+        return 'b1' if value else 'b0'
+    elif isinstance(value, numbers.Integral):
+        return f'i{int(value)}'
+    elif isinstance(value, numbers.Real):
+        return 'f' + repr(float(value))
+    else:
+        return 'o' + repr(f'{cls.__module__}.{cls.__qualname__}:{value!r}')
+
+
+def _array_digest(values: "np.ndarray") -> str:
+    import numpy as np
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f'{values.dtype.str}{values.shape}'.encode('utf-8'))
+    h.update(np.ascontiguousarray(values).tobytes())
+    return h.hexdigest()
+
+
+def _hash_tokens(tag: str, tokens: Iterable[str]) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(tag.encode('utf-8'))
+    h.update('\n'.join(tokens).encode('utf-8', 'surrogatepass'))
+    return h.hexdigest()
 
 
 class MetadataNode(metaclass=ABCMeta):
+    __slots__ = ('_parent', '_level', '_ref', '_tree', '_resolved',
+                 '_resolved_epoch')
+
     def __init__(self, parent: Union[None, "MetadataNode"]):
 
         self._parent = parent
         self._level: int = 0
         self._ref: Any = None
+        self._resolved: Union[None, dict] = None
+        self._resolved_epoch = -1
+        if _instrument._active is not None:
+            _instrument._active.counters['nodes_created'] += 1
         if parent is not None:
             self._level = parent._level + 1
+            self._tree: _MetadataTree = parent._tree
+        else:
+            self._tree = _MetadataTree()
+
+    _filename = _tree_attribute('filename')
+    _path = _tree_attribute('path')
+    _yaml_serializer = _tree_attribute('yaml_serializer')
 
     @staticmethod
     def _transform_value(parent: Union["MetadataNode", None],
                          value: Any) -> "MetadataNode":
 
         # wrap getter/setter in a metadata node instance
+        cls = type(value)
+        if cls is dict:
+            # fast path for plain containers
+            return MetadataMutableMappingNode(parent, value)
+        elif cls is list:
+            return MetadataMutableSequenceNode(parent, value)
         if isinstance(value, MetadataNode):
             # the value is already a metadata node, just return it
             return value
@@ -26,6 +357,9 @@ class MetadataNode(metaclass=ABCMeta):
             # specifically check for string to avoid
             # recursion because str is also a Sequence type
             return MetadataScalarNode(parent, value)
+        if _is_array(value):
+            # numeric array
+            return MetadataArrayNode(parent, value)
         if isinstance(value, collections.abc.MutableMapping):
             # the value is a key:value mapping
             return MetadataMutableMappingNode(parent, value)
@@ -37,30 +371,95 @@ class MetadataNode(metaclass=ABCMeta):
             return MetadataScalarNode(parent, value)
 
     def __getattr__(self, name: str) -> Any:
-        if name in self.__dict__:
-            # requests an attribute of the current node
-            return self.__dict__[name]
-        elif self._parent is not None:
-            # call the parent to retrieve the parameter
-            return self._parent.__getattr__(name)
-        else:
+        if name in _NODE_SLOTS:
+            # an unset slot of the node itself (e.g. during construction)
+            raise AttributeError(name)
+
+        # retrieve the parameter from the closest parent that defines it
+        owner = self._resolve_inherited_(name)
+        if owner is None:
             # could not find a parameter of the given name
+            if _instrument._active is not None:
+                _instrument._active.counters['getattr.miss'] += 1
             raise AttributeError(name)
+        return owner[name]
+
+    def _defines_(self, name: str) -> bool:
+        # whether the node itself defines a parameter of the given name
+        return False
+
+    def _resolution_cache_(self) -> dict:
+        epoch = self._tree.epoch
+        if self._resolved_epoch != epoch:
+            self._resolved = {}
+            self._resolved_epoch = epoch
+        return self._resolved
+
+    def _resolve_inherited_(self, name: str) -> Union["MetadataNode", None]:
+        """
+        Returns the closest parent node that defines the parameter `name`
+        or `None` if no parent defines it.
+
+        Results (including misses) are cached on all nodes visited during
+        the lookup, so that repeated lookups take constant time. The caches
+        are invalidated when keys are added to or removed from any mapping
+        of the tree.
+        """
+        cache = self._resolution_cache_()
+        try:
+            owner = cache[name]
+        except KeyError:
+            pass
+        else:
+            if _instrument._active is not None:
+                _instrument._active.counters['resolve.hit'] += 1
+            return owner
+
+        # walk up the parent chain until a node defines the parameter or
+        # already knows where it is defined
+        visited = [self]
+        owner = None
+        node = self._parent
+        while node is not None:
+            if node._defines_(name):
+                owner = node
+                break
+            node_cache = node._resolution_cache_()
+            if name in node_cache:
+                owner = node_cache[name]
+                break
+            visited.append(node)
+            node = node._parent
+
+        # none of the visited nodes defines the parameter, so they all
+        # inherit it from the same owner
+        for node in visited:
+            node._resolved[name] = owner
+
+        stats = _instrument._active
+        if stats is not None:
+            stats.counters['resolve.miss'] += 1
+            stats.lookup_depths[len(visited)] += 1
+        return owner
 
     @abstractmethod
     def _iter_nodes_(self) -> Iterator["MetadataCollectionNode"]:
         pass
 
+    def _materialized_nodes_(self) -> List["MetadataCollectionNode"]:
+        # child collection nodes that have already been created (in order)
+        return []
+
     @abstractmethod
     def __getitem__(self, index: Any) -> Any:
         pass
 
     def has_param(self, param_name: str) -> bool:
-        try:
-            _ = self.__getattr__(param_name)
-            return True
-        except AttributeError:
-            return False
+        found = (self._defines_(param_name)
+                 or self._resolve_inherited_(param_name) is not None)
+        if not found and _instrument._active is not None:
+            _instrument._active.counters['has_param.miss'] += 1
+        return found
 
     def get_param(self, param_name: Union[str, List[str]]) -> Any:
         if isinstance(param_name, str):
@@ -70,30 +469,275 @@ class MetadataNode(metaclass=ABCMeta):
         else:
             raise ValueError("param_name must be a string or list of strings.")
 
+    def walk(
+        self,
+        order: str = 'post',
+        prune: Union[None, Callable[["MetadataNode"], bool]] = None,
+        max_depth: Union[None, int] = None,
+    ) -> Iterator["MetadataCollectionNode"]:
+        """
+        Returns an iterator over all nested collection nodes.
+
+        The traversal uses an explicit stack instead of recursion, so that
+        deeply nested trees do not hit the recursion limit. Nodes are
+        visited lazily; the traversal stops as soon as the iterator is no
+        longer consumed.
+
+        Args:
+
+        - `order (str)`: `'post'` visits the children of a node before the
+          node itself, `'pre'` visits the node first.
+        - `prune (callable)`: Called with each visited node; if it returns
+          `True`, the children of that node are skipped.
+        - `max_depth (int)`: Maximum depth of the visited nodes relative to
+          this node (direct children have a depth of 1, so no nodes are
+          visited if it is less than 1).
+
+        Returns:
+
+        `Iterator`: The nested collection nodes (not including this node).
+        """
+        return self._walk_(None, order, prune, max_depth)
+
+    def _walk_(
+        self,
+        children: Union[None, Callable[["MetadataNode"],
+                                       Iterable["MetadataNode"]]],
+        order: str,
+        prune: Union[None, Callable[["MetadataNode"], bool]],
+        max_depth: Union[None, int],
+    ) -> Iterator["MetadataNode"]:
+        # traversal engine; `children` returns the child nodes of a node
+        # (default: `_iter_nodes_`)
+        if order not in ('pre', 'post'):
+            raise ValueError('"order" must be "pre" or "post".')
+        post = order == 'post'
+        if children is None:
+            children = _iter_nodes
+        if max_depth is not None and max_depth < 1:
+            return  # this node is not visited
+
+        # stack of the nodes on the current path and their child iterators
+        limited = prune is not None or max_depth is not None
+        stack = [(self, iter(children(self)))]
+        while stack:
+            for child in stack[-1][1]:
+                if not post:
+                    yield child
+                if limited and (
+                    (max_depth is not None and len(stack) >= max_depth) or
+                    (prune is not None and prune(child))):
+                    # do not descend into child node
+                    if post:
+                        yield child
+                    continue
+                stack.append((child, iter(children(child))))
+                break
+            else:
+                # all children visited
+                node = stack.pop()[0]
+                if post and stack:
+                    yield node
+
     def query(
         self,
-        predicate: Callable[["MetadataNode"], bool],
+        predicate: Union[None, Callable[["MetadataNode"], bool]] = None,
+        *,
+        where: Union[None, Mapping[Any, Any]] = None,
+        has: Union[None, Iterable[Any]] = None,
+        order: str = 'post',
+        prune: Union[None, Callable[["MetadataNode"], bool]] = None,
+        max_depth: Union[None, int] = None,
     ) -> Iterator[Any]:
-        for child in self._iter_nodes_():
-            # check children of child node
-            yield from child.query(predicate)
+        """
+        Returns an iterator over all nested collection nodes that match the
+        given conditions.
+
+        Args:
+
+        - `predicate (callable)`: Called with each node; nodes for which it
+          returns `True` match. An `AttributeError` raised by the predicate
+          counts as no match.
+        - `where (dict)`: Parameters that must have the given values, e.g.
+          `where={'x': 20}` corresponds to `node.x == 20` (inherited
+          parameters are taken into account).
+        - `has (list)`: Keys that must be defined by the node itself, e.g.
+          `has=['y']` corresponds to `'y' in node`.
+        - `order`, `prune`, `max_depth`: Control the traversal of the tree
+          (see `walk`).
+
+        The `where` and `has` conditions are evaluated with a key index of
+        the metadata tree that is built on first use and kept up to date on
+        mutation, so that non-matching subtrees are skipped.
 
-            # check child node itself
+        Returns:
+
+        `Iterator`: The matching nodes.
+        """
+        if where is None and has is None:
+            return self._query_predicate_(predicate, order, prune, max_depth)
+        else:
+            return self._query_index_(predicate, dict(where or {}),
+                                      list(has or []), order, prune, max_depth)
+
+    def _query_predicate_(
+        self,
+        predicate: Union[None, Callable[["MetadataNode"], bool]],
+        order: str,
+        prune: Union[None, Callable[["MetadataNode"], bool]],
+        max_depth: Union[None, int],
+    ) -> Iterator[Any]:
+        for node in self._walk_(None, order, prune, max_depth):
+            if predicate is None:
+                yield node
+                continue
             try:
-                if predicate(child):
-                    yield child
+                if _truth(predicate(node)):
+                    yield node
             except AttributeError:
                 pass
 
-    def first(self, predicate: Callable[["MetadataNode"],
-                                        bool]) -> "MetadataNode":
+    def _matches_(
+        self,
+        predicate: Union[None, Callable[["MetadataNode"], bool]],
+        where: dict,
+        has: list,
+    ) -> bool:
+        for key in has:
+            if not self._defines_(key):
+                return False
+        for key, value in where.items():
+            if self._defines_(key):
+                owner = self
+            else:
+                owner = self._resolve_inherited_(key)
+            if owner is None or not _truth(owner[key] == value):
+                return False
+        if predicate is not None:
+            try:
+                return _truth(predicate(self))
+            except AttributeError:
+                return False
+        return True
+
+    def _key_index_(self) -> _KeyIndex:
+        tree = self._tree
+        if tree.index is None:
+            # index the whole tree, starting at its root node
+            root = self
+            while root._parent is not None:
+                root = root._parent
+            index = _KeyIndex(tree)
+            index.add_subtree(root)
+            tree.index = index
+        return tree.index
+
+    def _query_index_(
+        self,
+        predicate: Union[None, Callable[["MetadataNode"], bool]],
+        where: dict,
+        has: list,
+        order: str,
+        prune: Union[None, Callable[["MetadataNode"], bool]],
+        max_depth: Union[None, int],
+    ) -> Iterator[Any]:
+        if not where and not has:
+            yield from self._query_predicate_(predicate, order, prune,
+                                              max_depth)
+            return
+
+        index = self._key_index_()
+        matches = {
+            k: node
+            for k, node in index.candidates(where, has).items()
+            if node is not self and node._matches_(predicate, where, has)
+        }
+
+        # collect the nodes on the paths from this node to the matches and
+        # to nested foreign trees (which are queried separately)
+        paths = {}
+        outside = set()
+        starts = [(node._parent, [node]) for node in matches.values()]
+        starts += [(container, [node])
+                   for container, node in index.foreign.values()]
+        for node, chain in starts:
+            while (node is not None and node is not self
+                   and id(node) not in paths and id(node) not in outside):
+                chain.append(node)
+                node = node._parent
+            if node is self or (node is not None and id(node) in paths):
+                paths.update((id(n), n) for n in chain)
+            else:
+                outside.update(id(n) for n in chain)
+
+        # only follow the collected paths and do not descend into foreign
+        # trees; all nodes on the paths have been created by the index
+        tree = self._tree
+
+        def children(node: MetadataNode) -> List[MetadataNode]:
+            if node._tree is not tree:
+                return []
+            return [
+                child for child in node._materialized_nodes_()
+                if id(child) in paths
+            ]
+
+        post = order == 'post'
+        for node in self._walk_(children, order, prune, max_depth):
+            if node._tree is tree:
+                if id(node) in matches:
+                    yield node
+                continue
+
+            # query the foreign tree with its own index (the node it is
+            # attached to belongs to this tree)
+            container = index.foreign[id(node)][0]
+            depth = container._level - self._level + 1
+            is_match = node._matches_(predicate, where, has)
+            if is_match and not post:
+                yield node
+            if ((max_depth is None or depth < max_depth)
+                    and (prune is None or not prune(node))):
+                yield from node.query(
+                    predicate,
+                    where=where,
+                    has=has,
+                    order=order,
+                    prune=prune,
+                    max_depth=None if max_depth is None else max_depth - depth,
+                )
+            if is_match and post:
+                yield node
+
+    def first(
+        self,
+        predicate: Union[None, Callable[["MetadataNode"], bool]] = None,
+        **kwargs,
+    ) -> "MetadataNode":
+        """
+        Returns the first node matching the given conditions (see `query`).
+        The traversal stops at the first match.
+        """
         try:
-            return next(self.query(predicate))
+            return next(self.query(predicate, **kwargs))
         except StopIteration:
             raise RuntimeError('No metadata matches the given predicate.')
 
+    def to_yaml(self,
+                filename: Union[str, Path],
+                description: Union[None, str, Iterable[str]] = None,
+                provenance: Any = None,
+                only_if_changed: bool = False) -> bool:
+        """Saves the metadata to a YAML file (see `metalib.to_yaml`)."""
+        # imported on first use (ruamel.yaml is slow to import)
+        from ._yaml import to_yaml
+        return to_yaml(filename, self, description, provenance,
+                       only_if_changed)
+
 
 class MetadataScalarNode(MetadataNode):
+    __slots__ = ()
+
     def __init__(self, parent: Union[MetadataNode, None], value: Any):
 
         # call super class
@@ -112,13 +756,199 @@ class MetadataScalarNode(MetadataNode):
         return repr(self._ref)
 
 
+class MetadataArrayNode(MetadataNode):
+    """
+    A homogeneous numeric list stored in a NumPy array. Comparisons are
+    vectorized and the array is available without copying as `values` (or
+    via `numpy.asarray(node)`).
+    """
+    __slots__ = ()
+
+    def __init__(self, parent: Union[MetadataNode, None],
+                 values: "np.ndarray"):
+
+        # call super class
+        super().__init__(parent)
+
+        # store a reference to the array
+        self._ref = values
+
+    @property
+    def values(self) -> "np.ndarray":
+        return self._ref
+
+    @staticmethod
+    def _asarray_(other: Any) -> "np.ndarray":
+        # NumPy was imported when the array of the node was created
+        import numpy as np
+        return np.asarray(other)
+
+    def __array__(self, dtype=None, copy=None) -> "np.ndarray":
+        if dtype is None or dtype == self._ref.dtype:
+            return self._ref
+        return self._ref.astype(dtype)
+
+    def __getitem__(self, index: Any) -> Any:
+        return self._ref[index]
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        self._ref[index] = value
+        if self._parent is not None:
+            self._parent._mark_modified_()
+        else:
+            self._tree.dirty = True
+
+    def __len__(self) -> int:
+        return len(self._ref)
+
+    def digest(self) -> str:
+        """
+        Returns a hash of the data type, shape and values of the array
+        (computed on every call, see `MetadataCollectionNode.digest`).
+        """
+        return _array_digest(self._ref)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._ref)
+
+    def __eq__(self, other: Any) -> "np.ndarray":
+        try:
+            return self._ref == self._asarray_(other)
+        except ValueError:
+            return False  # the shapes do not match
+
+    def __ne__(self, other: Any) -> "np.ndarray":
+        try:
+            return self._ref != self._asarray_(other)
+        except ValueError:
+            return True
+
+    def __lt__(self, other: Any) -> "np.ndarray":
+        return self._ref < self._asarray_(other)
+
+    def __le__(self, other: Any) -> "np.ndarray":
+        return self._ref <= self._asarray_(other)
+
+    def __gt__(self, other: Any) -> "np.ndarray":
+        return self._ref > self._asarray_(other)
+
+    def __ge__(self, other: Any) -> "np.ndarray":
+        return self._ref >= self._asarray_(other)
+
+    __hash__ = None
+
+    def _iter_nodes_(self) -> Iterator["MetadataCollectionNode"]:
+        yield from []
+
+    def __repr__(self) -> str:
+        return repr(self._ref.tolist())
+
+
 class MetadataCollectionNode(MetadataNode):
+    __slots__ = ('_child_nodes', '_digest')
+
     def __init__(self, parent: Union[MetadataNode, None]):
         super().__init__(parent)
+        self._digest: Union[None, str] = None
+
+    def digest(self) -> str:
+        """
+        Returns a hash of the content of the node (a Merkle hash of its
+        keys and values). Nodes with equal content have the same digest,
+        independent of the order of mapping keys. The digest tells the types
+        of values apart, e.g. `1`, `1.0` and `True` have different digests
+        (while `==` follows the rules of Python containers and uses the
+        digests only as a shortcut for equal content). NaN values are equal
+        to each other, so reloading an unchanged file gives the same digest.
+
+        Digests are computed bottom-up and cached on each collection node;
+        modifying a node through its methods invalidates the digests of the
+        node and its parents. Changes made directly to the underlying
+        containers (or through another tree that shares a subtree) are not
+        detected.
+
+        Returns:
+
+        `str`: The digest as hexadecimal string.
+        """
+        if self._digest is None:
+            # compute the missing digests of nested nodes first (explicit
+            # stack instead of recursion, see `walk`)
+            stack = [(self, False)]
+            while stack:
+                node, expanded = stack.pop()
+                if expanded:
+                    node._digest = node._compute_digest_()
+                    continue
+                stack.append((node, True))
+                stack.extend((child, False) for child in node._iter_nodes_()
+                             if child._digest is None)
+        return self._digest
+
+    @abstractmethod
+    def _compute_digest_(self) -> str:
+        # digest of the node, assuming the digests of all nested collection
+        # nodes are up to date
+        pass
+
+    def _value_token_(self, key: Any, value: Any) -> str:
+        if type(value) in _SCALAR_TYPES:
+            return _digest_token(value)
+        elif _is_collection(value):
+            return 'd' + self._child_node_(key)._digest
+        elif _is_array(value):
+            return 'a' + _array_digest(value)
+        return _digest_token(_scalar_value(value))
+
+    def _mark_modified_(self) -> None:
+        # marks the tree as modified and invalidates the digests of the node
+        # and its parents
+        self._tree.dirty = True
+        node = self
+        while node is not None:
+            node._digest = None
+            node = node._parent
+
+    def __eq__(self, other: Any) -> bool:
+        if self is other:
+            return True
+        elif isinstance(other, MetadataCollectionNode):
+            # equal content hashes (cached until a node is modified) are a
+            # fast answer; different hashes may still be equal in Python
+            # (e.g. `1` and `1.0`)
+            if self.digest() == other.digest():
+                return True
+        elif not _is_container(other):
+            return NotImplemented
+        return _equal_values(self._ref, other)
+
+    __hash__ = None
+
+    def _child_key_(self, node: MetadataNode) -> Any:
+        # key of a (materialized) child node or None
+        return None
+
+    def _unshare_(self) -> None:
+        # copy on write: a container that is shared with other parts of the
+        # tree (see `from_obj(..., intern=True)`) is replaced by a private
+        # copy before it is modified
+        shared = self._tree.shared
+        if shared is None or id(self._ref) not in shared:
+            return
+        parent = self._parent
+        if parent is not None:
+            parent._unshare_()
+        self._ref = self._ref.copy()
+        if parent is not None:
+            key = parent._child_key_(self)
+            if key is not None:
+                parent._ref[key] = self._ref
 
 
 class MetadataMutableMappingNode(MetadataCollectionNode,
                                  collections.abc.MutableMapping):
+    __slots__ = ()
+
     def __init__(
         self,
         parent: Union[MetadataNode, None],
@@ -131,11 +961,9 @@ class MetadataMutableMappingNode(MetadataCollectionNode,
         # store a reference to the mapping instance
         self._ref = mapping
 
-        # loop over values and build metadata node tree
-        self._child_nodes = {
-            key: MetadataNode._transform_value(self, value)
-            for key, value in mapping.items()
-        }
+        # child nodes are created on first access (see `_child_node_`);
+        # scalar values are not wrapped and are read directly from `_ref`
+        self._child_nodes = {}
 
     def __repr__(self) -> str:
         lines = []
@@ -150,45 +978,98 @@ class MetadataMutableMappingNode(MetadataCollectionNode,
         else:
             return '\n'.join(f'{self._level * "  "}{s}' for s in lines)
 
+    def _child_node_(self, key: Any) -> MetadataNode:
+        try:
+            return self._child_nodes[key]
+        except KeyError:
+            # wrap the value on first access
+            node = MetadataNode._transform_value(self, self._ref[key])
+            self._child_nodes[key] = node
+            return node
+
     def __getitem__(self, key: Any) -> Any:
-        node = self._child_nodes[key]
-        if isinstance(node, MetadataScalarNode):
-            # directly return scalar value
-            return node._ref
+        value = self._ref[key]
+        if _is_node_value(value):
+            # return collection and array nodes
+            return self._child_node_(key)
         else:
-            # return collection nodes
-            return node
+            # directly return scalar value
+            return _scalar_value(value)
 
     def __setitem__(self, key: Any, value: Any) -> None:
+        self._unshare_()
+        self._mark_modified_()
+        index = self._tree.index
+        if key not in self._ref:
+            # a new key may shadow parameters of parent nodes
+            self._tree.epoch += 1
+        elif index is not None:
+            index.remove_child(self, key)
         self._ref[key] = value
-        self._child_nodes[key] = MetadataNode._transform_value(self, value)
+        self._child_nodes.pop(key, None)
+        if index is not None:
+            index.add_child(self, key)
 
     def __iter__(self) -> Iterator[Any]:
-        return self._child_nodes.__iter__()
+        return self._ref.__iter__()
 
     def __len__(self) -> int:
-        return len(self._child_nodes)
+        return len(self._ref)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._ref
 
     def __delitem__(self, key: Any) -> None:
+        self._unshare_()
+        self._mark_modified_()
+        index = self._tree.index
+        if index is not None and key in self._ref:
+            index.remove_child(self, key)
         del self._ref[key]
-        del self._child_nodes[key]
+        self._child_nodes.pop(key, None)
+        self._tree.epoch += 1
 
     def __getattr__(self, name: str) -> Any:
-        if name in self:
+        if name in _NODE_SLOTS:
+            raise AttributeError(name)
+        elif name in self._ref:
             # the attribute name is in the child dictionary
             return self[name]
         else:
             # call super class
             return super().__getattr__(name)
 
+    def _defines_(self, name: str) -> bool:
+        return name in self._ref
+
+    def _compute_digest_(self) -> str:
+        # the items are sorted, so the digest does not depend on the order
+        # of the keys
+        return _hash_tokens(
+            'M',
+            sorted(f'{_digest_token(key)}\0{self._value_token_(key, value)}'
+                   for key, value in self._ref.items()))
+
+    def _child_key_(self, node: MetadataNode) -> Any:
+        for key, child in self._child_nodes.items():
+            if child is node:
+                return key
+        return None
+
     def _iter_nodes_(self) -> Iterator["MetadataCollectionNode"]:
-        for value in self._child_nodes.values():
-            if isinstance(value, MetadataCollectionNode):
-                yield value
+        for key, value in self._ref.items():
+            if _is_collection(value):
+                yield self._child_node_(key)
+
+    def _materialized_nodes_(self) -> List["MetadataCollectionNode"]:
+        nodes = self._child_nodes
+        return [nodes[key] for key in self._ref if key in nodes]
 
 
 class MetadataMutableSequenceNode(MetadataCollectionNode,
                                   collections.abc.MutableSequence):
+    __slots__ = ()
+
     def __init__(
         self,
         parent: Union[MetadataNode, None],
@@ -200,10 +1081,10 @@ class MetadataMutableSequenceNode(MetadataCollectionNode,
         # store a reference to the sequence instance
         self._ref = sequence
 
-        # loop over values and build metadata node tree
-        self._child_nodes = [
-            MetadataNode._transform_value(self, value) for value in sequence
-        ]
+        # child nodes are created on first access (see `_child_node_`);
+        # scalar values are not wrapped and are read directly from `_ref`
+        self._child_nodes: List[Union[MetadataNode,
+                                      None]] = [None] * len(sequence)
 
     def __repr__(self) -> str:
         lines = []
@@ -218,15 +1099,25 @@ class MetadataMutableSequenceNode(MetadataCollectionNode,
         else:
             return '\n'.join(f'- {s}' for s in lines)
 
+    def _child_node_(self, index: int) -> MetadataNode:
+        node = self._child_nodes[index]
+        if node is None:
+            # wrap the value on first access
+            node = MetadataNode._transform_value(self, self._ref[index])
+            self._child_nodes[index] = node
+        return node
+
     def __getitem__(self, index: Union[int, slice]) -> Any:
         if isinstance(index, slice):
-            raise NotImplementedError('Slicing ist not supported')
+            # new sequence of the underlying values (a shallow copy like
+            # list slicing; nested containers are shared, see `digest`)
+            return MetadataMutableSequenceNode(None, self._ref[index])
         elif isinstance(index, numbers.Integral):
-            node = self._child_nodes[index]
-            if isinstance(node, MetadataScalarNode):
-                return node._ref
+            value = self._ref[index]
+            if _is_node_value(value):
+                return self._child_node_(index)
             else:
-                return node
+                return _scalar_value(value)
         else:
             raise TypeError('"index" must be of type "int" or "slice".')
 
@@ -235,53 +1126,311 @@ class MetadataMutableSequenceNode(MetadataCollectionNode,
         index: Union[int, slice],
         value: Union[Any, Iterable[Any]],
     ) -> None:
+        self._unshare_()
+        self._mark_modified_()
         if isinstance(index, slice):
-            raise NotImplementedError('Slicing ist not supported')
+            self._set_slice_(index, value)
         elif isinstance(index, numbers.Integral):
+            key_index = self._tree.index
+            if key_index is not None:
+                key_index.remove_child(self, index)
             self._ref[index] = value
-            self._child_nodes[index] = MetadataNode._transform_value(
-                self, value)
+            self._child_nodes[index] = None
+            if key_index is not None:
+                key_index.add_child(self, index)
         else:
             raise TypeError('"index" must be of type "int" or "slice".')
 
     def __delitem__(self, index: Union[int, slice]) -> None:
+        self._unshare_()
+        self._mark_modified_()
         if isinstance(index, slice):
-            raise NotImplementedError('Slicing ist not supported')
+            key_index = self._tree.index
+            if key_index is not None:
+                for k in range(*index.indices(len(self._ref))):
+                    key_index.remove_child(self, k)
+            del self._ref[index]
+            del self._child_nodes[index]
         elif isinstance(index, numbers.Integral):
+            key_index = self._tree.index
+            if key_index is not None:
+                key_index.remove_child(self, index)
             del self._ref[index]
             del self._child_nodes[index]
-            print('Test')
         else:
             raise TypeError('"index" must be of type "int" or "slice".')
 
     def __iter__(self) -> Iterator[Any]:
-        for node in self._child_nodes.__iter__():
-            if isinstance(node, MetadataScalarNode):
-                yield node._ref
+        for index, value in enumerate(self._ref):
+            if _is_node_value(value):
+                yield self._child_node_(index)
             else:
-                yield node
+                yield _scalar_value(value)
 
     def __len__(self) -> int:
-        return len(self._child_nodes)
+        return len(self._ref)
 
     def insert(self, index: int, value: Any) -> None:
+        self._unshare_()
+        self._mark_modified_()
+        length = len(self._ref)
         self._ref.insert(index, value)
-        self._child_nodes.insert(index,
-                                 MetadataNode._transform_value(self, value))
+        self._child_nodes.insert(index, None)
+        key_index = self._tree.index
+        if key_index is not None:
+            # `insert` clips the index to the bounds of the sequence
+            if index < 0:
+                index = max(index + length, 0)
+            key_index.add_child(self, min(index, length))
+
+    def extend(self, values: Iterable[Any]) -> None:
+        # extend `_ref` and `_child_nodes` at once (instead of inserting
+        # item by item like `MutableSequence.extend`)
+        values = list(values)
+        self._unshare_()
+        self._mark_modified_()
+        start = len(self._ref)
+        self._ref.extend(values)
+        self._child_nodes.extend([None] * len(values))
+        key_index = self._tree.index
+        if key_index is not None:
+            for k in range(start, len(self._ref)):
+                key_index.add_child(self, k)
+
+    def _set_slice_(self, index: slice, values: Iterable[Any]) -> None:
+        values = list(values)
+        start, stop, step = index.indices(len(self._ref))
+        size = len(range(start, stop, step))
+        if step != 1 and len(values) != size:
+            raise ValueError(f'attempt to assign sequence of size '
+                             f'{len(values)} to extended slice of size {size}')
+
+        key_index = self._tree.index
+        if key_index is not None:
+            for k in range(start, stop, step):
+                key_index.remove_child(self, k)
+        self._ref[index] = values
+        self._child_nodes[index] = [None] * len(values)
+        if key_index is not None:
+            if step == 1:
+                positions = range(start, start + len(values))
+            else:
+                positions = range(start, stop, step)
+            for k in positions:
+                key_index.add_child(self, k)
 
     def _iter_nodes_(self) -> Iterator["MetadataCollectionNode"]:
-        for value in self:
-            if isinstance(value, MetadataCollectionNode):
-                yield value
+        for index, value in enumerate(self._ref):
+            if _is_collection(value):
+                yield self._child_node_(index)
 
+    def _materialized_nodes_(self) -> List["MetadataCollectionNode"]:
+        return [node for node in self._child_nodes if node is not None]
 
-def from_obj(obj: Union[MutableMapping, MutableSequence]) -> MetadataNode:
+    def _compute_digest_(self) -> str:
+        return _hash_tokens('L', (self._value_token_(index, value)
+                                  for index, value in enumerate(self._ref)))
+
+    def _child_key_(self, node: MetadataNode) -> Any:
+        for index, child in enumerate(self._child_nodes):
+            if child is node:
+                return index
+        return None
+
+
+_NODE_SLOTS = frozenset(MetadataNode.__slots__ +
+                        MetadataCollectionNode.__slots__)
+
+
+def _as_array(values: list) -> Union[None, "np.ndarray"]:
+    # lists of numbers of a single type (only ints or only floats, but not
+    # bools), so that saving the array keeps the types of the values
+    if not values:
+        return None
+    if isinstance(values[0], float):
+        kind = float
+    elif isinstance(values[0], int) and not isinstance(values[0], bool):
+        kind = int
+    else:
+        return None
+    for value in values:
+        if (not isinstance(value, kind) or isinstance(value, bool)
+                or _is_boolean(value)):
+            return None
+
+    import numpy as np
+    try:
+        return np.array(values,
+                        dtype=np.float64 if kind is float else np.int64)
+    except OverflowError:
+        return None
+
+
+def _is_container(value: Any) -> bool:
+    # raw dicts and lists (and other mutable mappings and sequences)
+    cls = type(value)
+    return cls is dict or cls is list or (
+        cls not in _SCALAR_TYPES and isinstance(
+            value,
+            (collections.abc.MutableMapping, collections.abc.MutableSequence)))
+
+
+def _equal_values(a: Any, b: Any) -> bool:
+    # Compares (nested) values with the rules of Python containers, using
+    # an explicit stack instead of recursion. Arrays are equal if they have
+    # the same shape and elements.
+    stack = [(a, b)]
+    while stack:
+        a, b = stack.pop()
+        if a is b:
+            continue
+        if isinstance(a, MetadataNode):
+            a = a._ref
+        if isinstance(b, MetadataNode):
+            b = b._ref
+        if _is_array(a) or _is_array(b):
+            import numpy as np
+            if not np.array_equal(a, b):
+                return False
+        elif _is_container(a) and _is_container(b):
+            is_mapping = isinstance(a, collections.abc.Mapping)
+            if (is_mapping != isinstance(b, collections.abc.Mapping)
+                    or len(a) != len(b)):
+                return False
+            if is_mapping:
+                for key, value in a.items():
+                    if key not in b:
+                        return False
+                    stack.append((value, b[key]))
+            else:
+                stack.extend(zip(a, b))
+        elif not a == b:
+            return False
+    return True
+
+
+def _convert_arrays(obj: Union[MutableMapping, MutableSequence]) -> None:
+    # replace homogeneous numeric lists by arrays (in place)
+    stack = [obj]
+    while stack:
+        container = stack.pop()
+        if isinstance(container, collections.abc.MutableMapping):
+            items = container.items()
+        else:
+            items = enumerate(container)
+        converted = []
+        for key, value in items:
+            if type(value) is list or isinstance(
+                    value, collections.abc.MutableSequence):
+                array = _as_array(value)
+                if array is not None:
+                    converted.append((key, array))
+                    continue
+            if _is_container(value):
+                stack.append(value)
+        for key, array in converted:
+            container[key] = array
+
+
+def _intern(obj: Union[MutableMapping, MutableSequence]) -> dict:
+    # Deduplicates identical subtrees (plain dicts and lists) and interns
+    # keys and scalar values (in place). Returns the containers that are
+    # referenced from more than one place as `{id(obj): obj}`.
+    values = {}  # (type, value) -> interned scalar value
+    subtrees = {}  # signature -> (number, first subtree with the signature)
+    # id(container) -> (container, signature); the signature is None for
+    # containers that are not deduplicated (the container is kept to avoid
+    # the reuse of the ids of replaced duplicates)
+    signatures = {}
+    references = {}  # id(container) -> number of references
+    shared = {}
+
+    # post-order traversal (children before their containers)
+    stack = [(obj, False)]
+    while stack:
+        container, children_done = stack.pop()
+        if id(container) in signatures:
+            continue  # referenced more than once in the input (aliases)
+        is_mapping = isinstance(container, collections.abc.MutableMapping)
+        if not children_done:
+            stack.append((container, True))
+            children = container.values() if is_mapping else container
+            stack.extend(
+                (value, False) for value in children if _is_container(value))
+            continue
+
+        items = container.items() if is_mapping else enumerate(container)
+        parts = []
+        changed = False
+        for key, value in items:
+            if _is_container(value):
+                signature = signatures[id(value)][1]
+                if signature is not None:
+                    number, interned = subtrees.setdefault(
+                        signature, (len(subtrees), value))
+                    signature = ('subtree', number)
+                else:
+                    interned = value
+                count = references.get(id(interned), 0) + 1
+                references[id(interned)] = count
+                if count > 1:
+                    shared[id(interned)] = interned
+            else:
+                if type(value) is str:
+                    value = sys.intern(value)
+                # the type distinguishes e.g. 1, 1.0 and True
+                signature = (type(value), value)
+                try:
+                    interned = values.setdefault(signature, value)
+                except TypeError:
+                    interned, signature = value, None  # not hashable
+            if is_mapping and type(key) is str:
+                interned_key = sys.intern(key)
+                changed = changed or interned_key is not key
+                key = interned_key
+            changed = changed or interned is not value
+            parts.append((key, interned, signature))
+
+        if changed:
+            if type(container) is dict:
+                # rebuild to replace the keys by the interned keys
+                container.clear()
+                container.update((key, value) for key, value, _ in parts)
+            else:
+                for key, value, _ in parts:
+                    if container[key] is not value:
+                        container[key] = value
+
+        # only plain containers are shared (others may carry formatting)
+        if (type(container) in (dict, list)
+                and all(signature is not None for _, _, signature in parts)):
+            signature = (type(container),
+                         tuple((type(key), key, signature)
+                               for key, _, signature in parts))
+        else:
+            signature = None
+        signatures[id(container)] = (container, signature)
+
+    return shared
+
+
+def from_obj(obj: Union[MutableMapping, MutableSequence],
+             arrays: bool = False,
+             intern: bool = False) -> MetadataNode:
     """
     Encapsulates a dictionary, list or iterable in a metadata structure.
 
     Args:
         
     - `obj (dict, list, Iterable)`: The object that will be encapsulated.
+    - `arrays (bool)`: If `True`, nested lists of numbers (e.g. measurement
+      vectors) are replaced by NumPy arrays in `obj`, which are accessed as
+      `MetadataArrayNode`. Only lists of integers or lists of floats are
+      converted; lists that mix both are kept.
+    - `intern (bool)`: If `True`, identical subtrees (dicts and lists) in
+      `obj` are replaced by a single shared instance and keys and values are
+      interned, which saves memory for repetitive data. A shared subtree is
+      copied when it is modified through its metadata node.
 
     Raises:
     
@@ -293,17 +1442,159 @@ def from_obj(obj: Union[MutableMapping, MutableSequence]) -> MetadataNode:
 
     """
     if isinstance(obj, MutableMapping):
-        return MetadataMutableMappingNode(None, obj)
+        node = MetadataMutableMappingNode(None, obj)
     elif isinstance(obj, MutableSequence):
-        return MetadataMutableSequenceNode(None, obj)
+        node = MetadataMutableSequenceNode(None, obj)
     else:
         raise ValueError('"obj" must be of type list or dict.')
 
+    if arrays:
+        _convert_arrays(obj)
+    if intern:
+        node._tree.shared = _intern(obj)
+    return node
+
+
+class MetadataConcatNode(MetadataNode, collections.abc.Sequence):
+    """
+    Read-only view of several metadata trees (see `concat`).
+
+    The view keeps references to the given nodes; they are neither copied
+    nor re-parented, so each member keeps inheriting parameters from its
+    own parents. Iteration, `query`, `walk` and `first` visit the members
+    in order.
+    """
+    __slots__ = ()
+
+    def __init__(self, members: Iterable[Any]):
+        super().__init__(None)
+        nodes = list(members)
+
+        # check the types instead of each member (usually all members are
+        # mapping nodes)
+        if not all(
+                issubclass(cls, MetadataNode)
+                and not issubclass(cls, MetadataConcatNode)
+                for cls in set(map(type, nodes))):
+            nodes = list(self._flatten_(nodes))
+        self._ref: List[MetadataNode] = nodes
+
+    @staticmethod
+    def _flatten_(members: List[Any]) -> Iterator[MetadataNode]:
+        for member in members:
+            if isinstance(member, MetadataConcatNode):
+                # flatten nested views
+                yield from member._ref
+            elif isinstance(member, MetadataNode):
+                yield member
+            else:
+                yield MetadataNode._transform_value(None, member)
+
+    def __repr__(self) -> str:
+        lines = [repr(member) for member in self._ref]
+
+        # total length
+        total_length = sum(len(s) for s in lines)
+        if total_length < 80:
+            return f'[ {", ".join(lines)} ]'
+        else:
+            return '\n'.join(f'- {s}' for s in lines)
+
+    @overload
+    def __getitem__(self, index: int) -> MetadataNode:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "MetadataConcatNode":
+        ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return MetadataConcatNode(self._ref[index])
+        return self._ref[index]
+
+    def __len__(self) -> int:
+        return len(self._ref)
+
+    def __iter__(self) -> Iterator[MetadataNode]:
+        return iter(self._ref)
+
+    def _iter_nodes_(self) -> Iterator["MetadataCollectionNode"]:
+        return iter(self._ref)
+
+    def query(
+        self,
+        predicate: Union[None, Callable[["MetadataNode"], bool]] = None,
+        *,
+        where: Union[None, Mapping[Any, Any]] = None,
+        has: Union[None, Iterable[Any]] = None,
+        order: str = 'post',
+        prune: Union[None, Callable[["MetadataNode"], bool]] = None,
+        max_depth: Union[None, int] = None,
+    ) -> Iterator[Any]:
+        """
+        Returns an iterator over the members and their nested collection
+        nodes that match the given conditions (see `MetadataNode.query`).
+        The members are queried one after another, each with the key index
+        of its own tree.
+        """
+        if order not in ('pre', 'post'):
+            raise ValueError('"order" must be "pre" or "post".')
+        return self._query_members_(predicate, dict(where or {}),
+                                    list(has or []), order, prune, max_depth)
+
+    def _query_members_(
+        self,
+        predicate: Union[None, Callable[["MetadataNode"], bool]],
+        where: dict,
+        has: list,
+        order: str,
+        prune: Union[None, Callable[["MetadataNode"], bool]],
+        max_depth: Union[None, int],
+    ) -> Iterator[Any]:
+        if max_depth is not None and max_depth < 1:
+            return  # the members have a depth of 1
+        post = order == 'post'
+        for member in self._ref:
+            is_match = member._matches_(predicate, where, has)
+            if is_match and not post:
+                yield member
+            if ((max_depth is None or max_depth > 1)
+                    and (prune is None or not prune(member))):
+                yield from member.query(
+                    predicate,
+                    where=where,
+                    has=has,
+                    order=order,
+                    prune=prune,
+                    max_depth=None if max_depth is None else max_depth - 1,
+                )
+            if is_match and post:
+                yield member
+
+    def get_param(self, param_name: Union[str, List[str]]) -> List[Any]:
+        """
+        Returns the value of a parameter (or a list of values if
+        `param_name` is a list) for each member; parameters may be
+        inherited from the parents of the member.
+
+        Raises:
+
+        - `AttributeError`: A member does not define the parameter.
+        """
+        return [member.get_param(param_name) for member in self._ref]
+
 
 def concat(
-        metadata_or_list: Union[MetadataNode,
-                                List[MetadataNode]]) -> MetadataNode:
+    metadata_or_list: Union[MetadataNode,
+                            Iterable[MetadataNode]]) -> MetadataNode:
+    """
+    Combines several metadata trees in a read-only view, e.g. to query the
+    datasets of many files at once (see `MetadataConcatNode`). Building the
+    view takes time proportional to the number of trees; the trees are not
+    copied. A single node is returned unchanged.
+    """
     if isinstance(metadata_or_list, MetadataNode):
         return metadata_or_list
     else:
-        return MetadataMutableSequenceNode(None, metadata_or_list)
+        return MetadataConcatNode(metadata_or_list)
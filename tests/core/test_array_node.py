@@ -0,0 +1,98 @@
+from pathlib import Path
+
+import numpy as np
+
+import metalib
+from metalib import MetadataArrayNode, MetadataMutableSequenceNode
+
+
+def create_metadata():
+    obj = dict(
+        name='test',
+        p1=[1, 2, 3],
+        p2=[1.5, 2.0, 3.5],
+        p3=[1, 'a', 2],
+        mixed=[1, 2.5],
+        p4=[True, False],
+        params=[dict(x=[10, 20, 30]), dict(x=[40, 50])],
+    )
+    return metalib.from_obj(obj, arrays=True)
+
+
+def test_numeric_lists_are_converted():
+    meta = create_metadata()
+
+    assert isinstance(meta.p1, MetadataArrayNode)
+    assert meta.p1.values.dtype == np.int64
+    assert meta.p2.values.dtype == np.float64
+    assert isinstance(meta.params[0].x, MetadataArrayNode)
+
+    # lists that are not homogeneous numbers are not converted
+    assert isinstance(meta.p3, MetadataMutableSequenceNode)
+    assert isinstance(meta.p4, MetadataMutableSequenceNode)
+    # ints and floats are not mixed, so that saving keeps the value types
+    assert isinstance(meta.mixed, MetadataMutableSequenceNode)
+    big = metalib.from_obj(dict(x=[2**60 + 1, 0.5]), arrays=True)
+    assert big.x[0] == 2**60 + 1
+    assert isinstance(meta.params, MetadataMutableSequenceNode)
+
+
+def test_no_conversion_by_default():
+    meta = metalib.from_obj(dict(p1=[1, 2, 3]))
+    assert isinstance(meta.p1, MetadataMutableSequenceNode)
+
+
+def test_values_are_not_copied():
+    meta = create_metadata()
+
+    assert meta.p1.values is meta._ref['p1']
+    assert np.asarray(meta.p1) is meta._ref['p1']
+    meta.p1[0] = 10
+    assert meta._ref['p1'][0] == 10
+    assert len(meta.p1) == 3
+    assert list(meta.p1) == [10, 2, 3]
+
+
+def test_vectorized_comparison():
+    meta = create_metadata()
+
+    assert (meta.p1 == [1, 2, 3]).all()
+    assert (meta.p1 > 1).tolist() == [False, True, True]
+    result = list(meta.query(lambda node: 'x' in node and (node.x > 35).any()))
+    assert len(result) == 1
+    assert result[0].x.values.tolist() == [40, 50]
+
+
+def test_query_array_values():
+    meta = create_metadata()
+    result = list(meta.query(where={'x': [40, 50]}))
+    assert [node.x.values.tolist() for node in result] == [[40, 50]]
+    assert not list(meta.query(where={'x': [40, 50, 60]}))
+
+    # predicates comparing arrays match if all elements are equal
+    result = list(meta.query(lambda node: node.x == [10, 20, 30]))
+    assert len(result) == 1
+    assert result[0].x.values.tolist() == [10, 20, 30]
+
+
+def test_array_nodes_are_not_traversed():
+    meta = create_metadata()
+    nodes = list(meta.walk())
+    assert not any(isinstance(node, MetadataArrayNode) for node in nodes)
+
+
+def test_save_arrays(tmp_path: Path):
+    meta = create_metadata()
+    meta['p5'] = np.arange(4) * 0.5
+    meta.to_yaml(tmp_path / 'dump.yaml')
+
+    text = (tmp_path / 'dump.yaml').read_text()
+    assert 'p1: [1, 2, 3]\n' in text
+    assert 'mixed:\n  - 1\n  - 2.5\n' in text
+    assert 'p5: [0.0, 0.5, 1.0, 1.5]\n' in text
+
+    loaded = metalib.from_yaml(tmp_path / 'dump.yaml', arrays=True)
+    assert loaded.p5.values.tolist() == [0.0, 0.5, 1.0, 1.5]
+    assert loaded.params[1].x.values.tolist() == [40, 50]
+    assert [isinstance(value, float)
+            for value in loaded.mixed] == [False, True]
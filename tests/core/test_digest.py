@@ -0,0 +1,164 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import metalib
+from metalib import MetadataMutableMappingNode
+
+
+def create_obj():
+    return dict(name='test',
+                value=2.5,
+                params=[dict(x=1, p=dict(y='a')),
+                        dict(x=2, p=[1, 2, 3])])
+
+
+def test_equal_content_has_equal_digest():
+    a = metalib.from_obj(create_obj())
+    b = metalib.from_obj(create_obj())
+    assert a is not b
+    assert a.digest() == b.digest()
+    assert a == b
+    assert a.params[0] == b.params[0]
+    assert a.params[0] != a.params[1]
+
+    # the order of mapping keys does not matter
+    c = metalib.from_obj(dict(reversed(list(create_obj().items()))))
+    assert c.digest() == a.digest()
+
+
+def test_digest_of_values():
+    def digest(value):
+        return metalib.from_obj(dict(v=value)).digest()
+
+    # values of different types have different digests
+    assert len({digest(1), digest(1.0), digest(True)}) == 3
+    assert digest(0) != digest(False) != digest(0.0)
+    assert digest(float('nan')) == digest(float('nan'))
+    assert digest(1) == digest(np.int64(1))
+    assert digest(True) == digest(np.bool_(True))
+    assert digest(1) != digest('1')
+    assert digest(None) != digest('None')
+    assert digest([1, 2]) != digest([2, 1])
+    assert digest(dict(a=1)) != digest([['a', 1]])
+    assert digest('a\nb') != digest(['a', 'b'])
+
+
+def test_digest_independent_of_loader(tmp_path: Path):
+    meta = metalib.from_obj(create_obj())
+    meta.to_yaml(tmp_path / 'dump.yaml')
+    roundtrip = metalib.from_yaml(tmp_path / 'dump.yaml')
+    fast = metalib.from_yaml(tmp_path / 'dump.yaml', mode='fast')
+    assert roundtrip.digest() == fast.digest()
+    assert roundtrip.params.digest() == meta.params.digest()
+
+    # anchored booleans and hexadecimal integers are scalar subclasses in
+    # the round-trip loader
+    filename = tmp_path / 'scalars.yaml'
+    filename.write_text('a: &x true\nb: *x\nc: 0xFF\nd: 1.50\ne: .nan\n')
+    expected = metalib.from_obj(
+        dict(a=True, b=True, c=255, d=1.5, e=float('nan'))).digest()
+    assert metalib.from_yaml(filename).digest() == expected
+    assert metalib.from_yaml(filename, mode='fast').digest() == expected
+
+
+@pytest.mark.parametrize('modify', [
+    lambda meta: meta.params[0].p.__setitem__('y', 'b'),
+    lambda meta: meta.params[0].p.__delitem__('y'),
+    lambda meta: meta.params[1].p.insert(0, 0),
+    lambda meta: meta.params[1].p.extend([4]),
+    lambda meta: meta.params[1].p.__setitem__(slice(0, 2), [5]),
+    lambda meta: meta.params[1].p.__delitem__(0),
+    lambda meta: meta.params.append(dict(x=3)),
+])
+def test_modification_invalidates_ancestors(modify):
+    meta = metalib.from_obj(create_obj())
+    before = meta.digest()
+    sibling = meta.params[0].digest()
+    modify(meta)
+    assert meta.digest() != before
+    assert meta != metalib.from_obj(create_obj())
+
+    # the digest is recomputed from the modified content
+    assert meta.digest() == metalib.from_obj(meta._ref).digest()
+    if meta.params[0].p._ref == dict(y='a'):
+        assert meta.params[0].digest() == sibling
+
+
+def test_array_modification():
+    meta = metalib.from_obj(dict(x=[1, 2, 3]), arrays=True)
+    before = meta.digest()
+    meta.x[0] = 5
+    assert meta.digest() != before
+    assert meta.x.digest() != metalib.from_obj(dict(x=[1, 2, 3]),
+                                               arrays=True).x.digest()
+
+
+def test_digest_is_cached(monkeypatch):
+    a = metalib.from_obj(create_obj())
+    b = metalib.from_obj(create_obj())
+    assert a == b
+
+    calls = []
+    compute = MetadataMutableMappingNode._compute_digest_
+
+    def counting(self):
+        calls.append(self)
+        return compute(self)
+
+    monkeypatch.setattr(MetadataMutableMappingNode, '_compute_digest_',
+                        counting)
+    assert a == b
+    assert not calls
+
+    # only the modified node and its ancestors are recomputed
+    a.params[0].p['y'] = 'b'
+    assert a != b
+    assert calls == [a.params[0].p, a.params[0], a]
+
+
+def test_digest_of_deep_tree():
+    obj = node = dict()
+    for k in range(5000):
+        node['child'] = dict(level=k)
+        node = node['child']
+    assert metalib.from_obj(obj) == metalib.from_obj(obj)
+
+
+def test_compare_with_plain_containers():
+    meta = metalib.from_obj(create_obj())
+    assert meta.params[0] == dict(x=1, p=dict(y='a'))
+    assert meta.params[0].p == dict(y='a')
+    with pytest.raises(TypeError):
+        hash(meta.params)
+
+
+def test_equality_follows_python_rules():
+    a = metalib.from_obj(dict(x=1, y=[1, 2]))
+    b = metalib.from_obj(dict(x=1.0, y=[True, 2.0]))
+    assert a.digest() != b.digest()
+    assert a == b
+    assert (a == b) == (dict(a) == dict(b)) == (a == b._ref)
+    assert a != metalib.from_obj(dict(x=1, y=[1, 3]))
+    assert a != metalib.from_obj([1, 2])
+    assert a != 1
+
+    # arrays are compared element-wise
+    a = metalib.from_obj(dict(x=[1, 2]), arrays=True)
+    assert a == metalib.from_obj(dict(x=[1.0, 2.0]), arrays=True)
+    assert a != metalib.from_obj(dict(x=[1, 2, 3]), arrays=True)
+    assert a == dict(x=[1, 2])
+
+
+def test_equality_of_deep_trees():
+    def deep(leaf):
+        obj = node = dict()
+        for k in range(5000):
+            node['child'] = dict(level=k)
+            node = node['child']
+        node['leaf'] = leaf
+        return metalib.from_obj(obj)
+
+    assert deep(1) == deep(1.0)
+    assert deep(1) != deep(2)
@@ -171,4 +171,49 @@ def test_value_iteration():
 
     assert lst[0] == 'a'
     assert lst[1] == 'b'
-    assert lst[4] == 12.0
\ No newline at end of file
+    assert lst[4] == 12.0
+
+def test_child_nodes_are_created_on_access():
+    mapping = dict(a=dict(aa=1), b=[1, 2], c=3)
+    node = MetadataMutableMappingNode(None, mapping)
+
+    # no child nodes before first access
+    assert len(node._child_nodes) == 0
+
+    # access creates and caches the child node
+    child = node['a']
+    assert set(node._child_nodes) == {'a'}
+    assert node['a'] is child
+    assert child._parent is node
+
+
+def test_replaced_child_node_is_recreated():
+    mapping = dict(a=dict(aa=1), b=1)
+    node = MetadataMutableMappingNode(None, mapping)
+
+    child = node['a']
+    node['a'] = dict(ab=2)
+    assert node['a'] is not child
+    assert node['a']['ab'] == 2
+
+    del node['a']
+    assert 'a' not in node
+    assert 'a' not in node._child_nodes
+
+
+def test_nodes_have_no_instance_dict():
+    node = MetadataMutableMappingNode(None, dict(a=dict(b=1), c=[1]))
+
+    assert not hasattr(node, '__dict__')
+    assert not hasattr(node['a'], '__dict__')
+    assert not hasattr(node['c'], '__dict__')
+
+
+def test_scalars_are_not_wrapped():
+    mapping = dict(a='test', b=2, c=dict(d=3))
+    node = MetadataMutableMappingNode(None, mapping)
+
+    assert node['a'] == 'test'
+    assert node.b == 2
+    assert list(node.values())[:2] == ['test', 2]
+    assert set(node._child_nodes) == {'c'}
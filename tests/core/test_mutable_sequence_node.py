@@ -1,5 +1,9 @@
+from pathlib import Path
+
 import numpy as np
 import pytest
+
+import metalib
 from metalib import MetadataMutableMappingNode, MetadataMutableSequenceNode
 
 
@@ -159,3 +163,95 @@ def test_iteration():
 
     assert lst[0] == 'a'
     assert lst[1] == 'b'
+
+
+def test_child_nodes_are_created_on_access():
+    sequence = [dict(a=1), [1, 2], 3]
+    node = MetadataMutableSequenceNode(None, sequence)
+
+    # no child nodes before first access
+    assert node._child_nodes == [None, None, None]
+
+    # access creates and caches the child node
+    child = node[1]
+    assert node._child_nodes[1] is child
+    assert node[1] is child
+    assert child._parent is node
+
+
+def test_inserted_child_nodes_keep_positions():
+    sequence = [dict(a=1), dict(a=2)]
+    node = MetadataMutableSequenceNode(None, sequence)
+
+    first = node[0]
+    node.insert(0, dict(a=0))
+    assert node[1] is first
+    assert [item['a'] for item in node] == [0, 1, 2]
+
+
+def test_slice_access():
+    sequence = [dict(a=1), 2, [3, 4], 5]
+    node = MetadataMutableSequenceNode(None, sequence)
+
+    part = node[1:3]
+    assert isinstance(part, MetadataMutableSequenceNode)
+    assert len(part) == 2
+    assert part[0] == 2
+    assert part[1]._ref is sequence[2]
+    assert list(node[::-2]) == [5, 2]
+    assert len(node[10:]) == 0
+
+    # the slice is a new list of the underlying values
+    part.append(6)
+    assert len(node) == 4
+
+
+def test_save_slice(tmp_path: Path):
+    meta = metalib.from_obj(dict(l=[dict(a=1), dict(a=2), 3]))
+    meta.l[0:2].to_yaml(tmp_path / 'slice.yaml')
+    loaded = metalib.from_yaml(tmp_path / 'slice.yaml', mode='fast')
+    assert loaded._ref == [dict(a=1), dict(a=2)]
+
+
+def test_slice_assignment():
+    sequence = [dict(a=1), dict(a=2), dict(a=3)]
+    node = MetadataMutableSequenceNode(None, sequence)
+    last = node[2]
+
+    node[0:2] = [dict(a=10), dict(a=11), dict(a=12)]
+    assert [item['a'] for item in node] == [10, 11, 12, 3]
+    assert sequence[1] == dict(a=11)
+    assert node[3] is last
+    assert len(node._child_nodes) == 4
+
+    node[::2] = [dict(a=20), dict(a=21)]
+    assert [item['a'] for item in node] == [20, 11, 21, 3]
+    with pytest.raises(ValueError):
+        node[::2] = [1, 2, 3]
+    assert [item['a'] for item in node] == [20, 11, 21, 3]
+
+
+def test_slice_deletion():
+    sequence = [dict(a=k) for k in range(6)]
+    node = MetadataMutableSequenceNode(None, sequence)
+    last = node[5]
+
+    del node[1:3]
+    assert [item['a'] for item in node] == [0, 3, 4, 5]
+    del node[::2]
+    assert [item['a'] for item in node] == [3, 5]
+    assert node[1] is last
+    assert len(sequence) == len(node._child_nodes) == 2
+
+
+def test_extend():
+    sequence = [dict(a=1)]
+    node = MetadataMutableSequenceNode(None, sequence)
+    first = node[0]
+
+    node.extend(dict(a=k) for k in range(2, 5))
+    node += [5]
+    assert sequence == [dict(a=1), dict(a=2), dict(a=3), dict(a=4), 5]
+    assert node._child_nodes[1:] == [None] * 4
+    assert node[0] is first
+    assert node[3]['a'] == 4
@@ -1,6 +1,7 @@
+import numpy as np
 from metalib.core import MetadataMutableMappingNode, MetadataMutableSequenceNode, MetadataScalarNode
 import pytest
-from metalib import MetadataNode
+from metalib import MetadataArrayNode, MetadataNode
 
 
 def test_map_string():
@@ -19,3 +20,10 @@ def test_map_list():
     value = ['a', 2, 3, 4]
     node = MetadataNode._transform_value(None, value)
     assert isinstance(node, MetadataMutableSequenceNode)
+
+
+def test_map_array():
+    value = np.array([1.0, 2.0])
+    node = MetadataNode._transform_value(None, value)
+    assert isinstance(node, MetadataArrayNode)
+    assert node.values is value
@@ -1,3 +1,4 @@
+import pytest
 from metalib.core import MetadataNode
 
 import metalib
@@ -85,4 +86,180 @@ def test_query():
     assert result[0].z == 200
     assert result[0].name == 'a'
     assert result[1].z == 300
-    assert result[1].name == 'a'
\ No newline at end of file
+    assert result[1].name == 'a'
+
+
+def test_inherited_lookup_is_cached():
+    meta = create_metadata()
+    p4 = meta.params[1].p4
+
+    assert p4.name == 'a'
+    assert p4._resolved['name'] is meta
+    assert meta.params._resolved['name'] is meta
+
+
+def test_inherited_lookup_after_adding_key():
+    meta = create_metadata()
+    p4 = meta.params[1].p4
+    assert p4.name == 'a'
+    assert not p4.has_param('unknown')
+
+    # new keys shadow or add inherited parameters
+    meta.params[1]['name'] = 'b'
+    meta['unknown'] = 1
+    assert p4.name == 'b'
+    assert meta.params[0].p4.name == 'a'
+    assert p4.has_param('unknown')
+
+
+def test_inherited_lookup_after_deleting_key():
+    meta = create_metadata()
+    meta.params[1]['name'] = 'b'
+    p4 = meta.params[1].p4
+    assert p4.name == 'b'
+
+    del meta.params[1]['name']
+    assert p4.name == 'a'
+
+    del meta['name']
+    assert not p4.has_param('name')
+
+
+def test_inherited_lookup_after_changing_value():
+    meta = create_metadata()
+    p4 = meta.params[1].p4
+    assert p4.value == 2.4
+
+    meta['value'] = 3.6
+    assert p4.value == 3.6
+
+
+def test_structured_query():
+    meta = create_metadata()
+
+    result = list(meta.query(where={'x': 20}, has=['y']))
+    expected = list(meta.query(lambda node: ('y' in node) and (node.x == 20)))
+
+    assert len(result) == 2
+    assert all(a is b for a, b in zip(result, expected))
+
+
+def test_structured_query_with_inherited_parameter():
+    meta = create_metadata()
+
+    result = list(meta.params.query(where={'p1': '3'}, has=['x']))
+    assert [node.z for node in result] == [200, 300, 400]
+
+    result = list(meta.query(where={'p2': 4}))
+    expected = list(meta.query(lambda node: node.p2 == 4))
+    assert len(result) == 9
+    assert all(a is b for a, b in zip(result, expected))
+
+
+def test_key_index_candidates():
+    index = create_metadata()._key_index_()
+
+    # `where` or `has` conditions alone
+    assert len(index.candidates({'x': 20}, [])) == 2
+    assert len(index.candidates({}, iter(['y', 'x']))) == 3
+    with pytest.raises(ValueError):
+        index.candidates({}, [])
+
+
+def test_structured_query_with_predicate():
+    meta = create_metadata()
+
+    result = list(meta.query(lambda node: node.z > 250, has=['x']))
+    assert [node.z for node in result] == [300, 400]
+
+
+def test_structured_query_after_mutation():
+    meta = create_metadata()
+    assert len(list(meta.query(where={'x': 20}, has=['y']))) == 2
+
+    meta.params[0].p4['x'] = 20
+    meta.params[3].p4['y'] = 10
+    del meta.params[2]
+    meta.params.append(dict(p4=dict(x=20, y=1)))
+    meta.params.insert(0, dict(p4=dict(x=20, y=2)))
+
+    result = list(meta.query(where={'x': 20}, has=['y']))
+    expected = list(meta.query(lambda node: ('y' in node) and (node.x == 20)))
+    assert [node.y for node in result] == [2, 20, 20, 1]
+    assert all(a is b for a, b in zip(result, expected))
+
+
+def test_structured_query_after_slice_mutation():
+    meta = create_metadata()
+    assert len(list(meta.query(where={'x': 20}, has=['y']))) == 2
+
+    meta.params[1:3] = [dict(p4=dict(x=20, y=1))]
+    meta.params.extend([dict(p4=dict(x=20, y=2)), dict(p4=dict(x=20))])
+    del meta.params[:1]
+
+    result = list(meta.query(where={'x': 20}, has=['y']))
+    expected = list(meta.query(lambda node: ('y' in node) and (node.x == 20)))
+    assert [node.y for node in result] == [1, 2]
+    assert all(a is b for a, b in zip(result, expected))
+
+
+def test_structured_query_on_subtree():
+    meta = create_metadata()
+
+    result = list(meta.params[1].query(has=['y']))
+    assert len(result) == 1
+    assert result[0].z == 200
+
+
+def test_structured_query_with_nested_tree():
+    meta = create_metadata()
+    other = metalib.from_obj(dict(x=20, sub=dict(y=1)))
+    meta['other'] = other
+
+    result = list(meta.query(where={'x': 20}, has=['y']))
+    assert len(result) == 3
+    assert result[-1] is other['sub']
+
+
+def test_walk_order():
+    meta = metalib.from_obj(dict(a=dict(b=dict(), c=[dict()]), d=[]))
+    a, b, c, d = meta.a, meta.a.b, meta.a.c, meta.d
+
+    post = list(meta.walk())
+    pre = list(meta.walk(order='pre'))
+
+    assert [id(n) for n in post] == [id(n) for n in (b, c[0], c, a, d)]
+    assert [id(n) for n in pre] == [id(n) for n in (a, b, c, c[0], d)]
+
+
+def test_walk_prune_and_max_depth():
+    meta = create_metadata()
+
+    nodes = list(meta.walk(max_depth=2))
+    assert len(nodes) == 5
+
+    nodes = list(meta.walk(prune=lambda node: 'p1' in node))
+    assert len(nodes) == 5
+
+    # no nodes have a depth below 1
+    for max_depth in (0, -1):
+        assert not list(meta.walk(max_depth=max_depth))
+        assert not list(meta.query(max_depth=max_depth))
+        assert not list(meta.query(where={'x': 20}, max_depth=max_depth))
+        assert not list(
+            metalib.concat([meta, meta]).query(max_depth=max_depth))
+    assert len(list(metalib.concat([meta, meta]).query(max_depth=1))) == 2
+
+
+def test_query_deeply_nested_tree():
+    obj = node = dict(name='a')
+    for k in range(5000):
+        node['child'] = dict(level=k)
+        node = node['child']
+    meta = metalib.from_obj(obj)
+
+    result = meta.first(lambda node: node.level == 4999)
+    assert result.name == 'a'
+
+    result = list(meta.query(lambda node: node.level < 3, order='pre'))
+    assert [node.level for node in result] == [0, 1, 2]
@@ -0,0 +1,95 @@
+import asyncio
+from pathlib import Path
+import shutil
+
+import pytest
+
+import metalib
+from metalib._yaml import _get_git_commit_hash
+
+
+@pytest.fixture
+def metadata_dir(tmp_path: Path) -> Path:
+    source = Path(__file__).parent / 'data/test.yaml'
+    for k in range(6):
+        shutil.copy(source, tmp_path / f'test{k}.yaml')
+    return tmp_path
+
+
+def test_async_from_yaml():
+    filename = Path(__file__).parent / 'data/test.yaml'
+    meta = asyncio.run(metalib.async_from_yaml(filename))
+
+    assert meta._filename == 'test.yaml'
+    assert meta._ref == metalib.from_yaml(filename)._ref
+
+
+def test_async_to_yaml(tmp_path: Path):
+    meta = metalib.from_obj(dict(name='Test'))
+    asyncio.run(
+        metalib.async_to_yaml(tmp_path / 'dump.yaml', meta, description='A'))
+
+    dumped = metalib.from_yaml(tmp_path / 'dump.yaml')
+    assert dumped.name == 'Test'
+    assert dumped['$history'][-1]['$script'] == 'test_async.py'
+    assert dumped['$history'][-1]['$git-commit'] == _get_git_commit_hash()
+    assert list(dumped['$history'][-1]['$description']) == ['A']
+    assert '$history' not in meta
+
+
+def test_async_load_and_save_many(metadata_dir: Path, tmp_path: Path):
+    async def copy_all():
+        metadata = await metalib.async_load_many(metadata_dir, limit=2)
+        output = tmp_path / 'output'
+        output.mkdir()
+        await metalib.async_save_many([(output / meta._filename, meta)
+                                       for meta in metadata],
+                                      limit=3)
+        return output
+
+    output = asyncio.run(copy_all())
+    result = metalib.load_many(output, workers=1)
+    assert [meta._filename
+            for meta in result] == [f'test{k}.yaml' for k in range(6)]
+    assert all(meta['$history'][-1]['$origin'] == meta._filename
+               for meta in result)
+
+
+def test_async_load_many_errors(metadata_dir: Path):
+    (metadata_dir / 'broken.yaml').write_text('a: [1, 2\n')
+
+    with pytest.raises(metalib.MetadataLoadError) as info:
+        asyncio.run(metalib.async_load_many(metadata_dir))
+    assert set(info.value.errors) == {metadata_dir / 'broken.yaml'}
+    assert len(info.value.results) == 6
+
+    result = asyncio.run(metalib.async_load_many(metadata_dir, errors='skip'))
+    assert len(result) == 6
+
+
+def test_async_gather_limits_concurrency():
+    running = 0
+    max_running = 0
+
+    async def task(value):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return value
+
+    result = asyncio.run(metalib.async_gather(map(task, range(10)), limit=3))
+    assert result == list(range(10))
+    assert max_running == 3
+
+
+def test_async_gather_raises_first_error():
+    async def task(value):
+        await asyncio.sleep(0.01)
+        if value == 2:
+            raise KeyError(value)
+        return value
+
+    with pytest.raises(KeyError):
+        asyncio.run(metalib.async_gather(map(task, range(10)), limit=2))
@@ -0,0 +1,67 @@
+import pytest
+
+import metalib
+from metalib import MetadataConcatNode
+
+
+def create_datasets():
+    first = metalib.from_obj(
+        dict(name='first', params=[dict(x=1, y=10),
+                                   dict(x=2, p=dict(x=3))]))
+    second = metalib.from_obj(dict(name='second', params=[dict(x=4)]))
+    return first, second
+
+
+def test_concat_keeps_references():
+    first, second = create_datasets()
+    cat = metalib.concat([first, second])
+    assert isinstance(cat, MetadataConcatNode)
+    assert len(cat) == 2
+    assert cat[0] is first
+    assert list(cat) == [first, second]
+
+    # members are not re-parented
+    assert first._parent is None
+    assert cat[1].params[0].name == 'second'
+
+    # a single node is returned unchanged
+    assert metalib.concat(first) is first
+
+
+def test_concat_flattens_views():
+    first, second = create_datasets()
+    cat = metalib.concat([metalib.concat([first]), second])
+    assert list(cat) == [first, second]
+    assert list(cat[1:]) == [second]
+
+
+def test_concat_wraps_containers():
+    cat = metalib.concat([dict(x=1), [1, 2]])
+    assert cat[0].x == 1
+    assert list(cat[1]) == [1, 2]
+
+
+def test_concat_query():
+    first, second = create_datasets()
+    cat = metalib.concat([first, second])
+
+    xs = [node.x for node in cat.query(lambda node: node.x > 1)]
+    assert xs == [3, 2, 4]
+    names = [node.name for node in cat.query(where={'x': 1})]
+    assert names == ['first']
+    assert [node.x for node in cat.query(has=['x'], max_depth=3)] == [1, 2, 4]
+    assert cat.query(lambda node: node.name == 'second',
+                     order='pre').__next__() is second
+    assert cat.first(where={'x': 4}).name == 'second'
+
+
+def test_concat_get_param():
+    first, second = create_datasets()
+    cat = metalib.concat([first, second])
+    assert cat.get_param('name') == ['first', 'second']
+    assert cat.get_param(['name']) == [['first'], ['second']]
+
+    params = metalib.concat([first.params[1], second.params[0]])
+    assert params.get_param('name') == ['first', 'second']
+    with pytest.raises(AttributeError):
+        cat.get_param('y')
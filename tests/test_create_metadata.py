@@ -1,6 +1,8 @@
 from pathlib import Path
 from datetime import date
 
+import pytest
+
 import metalib
 
 
@@ -41,3 +43,31 @@ def test_from_yaml_includes_filepath():
 
     assert isinstance(meta._path, Path)
     assert meta._path == filename.parent
+
+
+def test_filepath_is_shared_by_child_nodes():
+    filename = Path(__file__).parent / 'data/test.yaml'
+    meta = metalib.from_yaml(filename)
+
+    assert meta.stage_position._filename == filename.name
+    assert meta.datasets[0]._path == filename.parent
+
+
+def test_from_yaml_fast_mode():
+    filename = Path(__file__).parent / 'data/test.yaml'
+    meta = metalib.from_yaml(filename, mode='fast')
+
+    # same values as in round-trip mode
+    assert meta._ref == metalib.from_yaml(filename)._ref
+    assert meta.datasets[0].piv_region == '16x16'
+
+    # plain python objects
+    assert type(meta._ref) is dict
+    assert type(meta.datasets._ref) is list
+    assert meta._filename == filename.name
+
+
+def test_from_yaml_invalid_mode():
+    filename = Path(__file__).parent / 'data/test.yaml'
+    with pytest.raises(ValueError):
+        metalib.from_yaml(filename, mode='unknown')
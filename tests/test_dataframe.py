@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+import metalib
+
+
+def create_datasets():
+    obj = dict(name='a',
+               value=2.4,
+               params=[
+                   dict(p1='1', p2=2, p4=dict(x=10, y=20)),
+                   dict(p1='3', p2=4, p4=dict(x=20, y=20)),
+                   dict(p1='3', p2=4.5, p4=dict(x=30), value=3.6),
+               ])
+    meta = metalib.from_obj(obj)
+    return list(meta.params)
+
+
+def test_columns_of_datasets():
+    df = metalib.to_dataframe(create_datasets())
+
+    assert list(df.columns) == ['p1', 'p2', 'p4', 'value']
+    assert len(df) == 3
+    assert list(df.p1) == ['1', '3', '3']
+    assert df.p2.dtype == np.float64
+    assert list(df.value) == [2.4, 2.4, 3.6]  # inherited from root
+
+
+def test_include_inherited_keys():
+    df = metalib.to_dataframe(create_datasets(),
+                              include_keys=['name', 'value'])
+
+    assert list(df.name) == ['a', 'a', 'a']
+    assert list(df.value) == [2.4, 2.4, 3.6]
+
+
+def test_include_nested_keys():
+    df = metalib.to_dataframe(create_datasets(),
+                              include_keys=['p4.x', 'p4.y'],
+                              exclude_keys='p4')
+
+    assert list(df.columns) == ['p1', 'p2', 'value', 'p4.x', 'p4.y']
+    assert df['p4.x'].dtype == np.int64
+    assert list(df['p4.x']) == [10, 20, 30]
+    assert df['p4.y'][1] == 20
+    assert pd.isna(df['p4.y'][2])
+
+
+def test_exclude_keys():
+    df = metalib.to_dataframe(create_datasets(),
+                              include_keys='name',
+                              exclude_keys=['p4', 'name'])
+
+    assert list(df.columns) == ['p1', 'p2', 'value']
@@ -0,0 +1,176 @@
+import copy
+import random
+
+import pytest
+
+import metalib
+from metalib import DiffOperation, _diff
+
+
+def create_obj():
+    return dict(
+        name='test',
+        value=2.5,
+        params=[dict(x=1, p=dict(y='a')),
+                dict(x=2, p=[1, 2, 3]),
+                dict(x=3)])
+
+
+def strict_equal(x, y) -> bool:
+    # equality that tells the types of values apart (`1 == True == 1.0`)
+    if type(x) is not type(y):
+        return False
+    elif isinstance(x, dict):
+        return x.keys() == y.keys() and all(
+            strict_equal(value, y[key]) for key, value in x.items())
+    elif isinstance(x, list):
+        return len(x) == len(y) and all(map(strict_equal, x, y))
+    return x == y
+
+
+def check_patch(a, b):
+    ops = metalib.diff(a, b)
+    patched = metalib.apply_patch(metalib.from_obj(copy.deepcopy(a)), ops)
+    assert strict_equal(patched._ref, b)
+    return ops
+
+
+def test_identical():
+    a = metalib.from_obj(create_obj())
+    assert metalib.diff(a, create_obj()) == []
+    assert metalib.diff(a, a) == []
+
+
+def test_mapping_changes():
+    b = create_obj()
+    b['value'] = 3.5
+    b['unit'] = 'mm'
+    del b['name']
+    ops = check_patch(create_obj(), b)
+    assert ops == [
+        DiffOperation('remove', ('name', )),
+        DiffOperation('replace', ('value', ), 3.5),
+        DiffOperation('add', ('unit', ), 'mm'),
+    ]
+
+
+def test_nested_changes():
+    b = create_obj()
+    b['params'][0]['p']['y'] = 'b'
+    b['params'][1]['p'].append(4)
+    ops = check_patch(create_obj(), b)
+    assert ops == [
+        DiffOperation('replace', ('params', 0, 'p', 'y'), 'b'),
+        DiffOperation('add', ('params', 1, 'p', 3), 4),
+    ]
+
+
+def test_sequence_changes():
+    b = create_obj()
+    del b['params'][0]
+    b['params'].insert(1, dict(x=10))
+    ops = check_patch(create_obj(), b)
+    assert ops == [
+        DiffOperation('remove', ('params', 0)),
+        DiffOperation('add', ('params', 1), dict(x=10)),
+    ]
+
+    # changed items are diffed recursively (after the changes of the
+    # sequence itself)
+    b = create_obj()
+    b['params'][1]['x'] = 20
+    del b['params'][2]
+    ops = check_patch(create_obj(), b)
+    assert ops == [
+        DiffOperation('remove', ('params', 2)),
+        DiffOperation('replace', ('params', 1, 'x'), 20),
+    ]
+
+
+def test_type_changes():
+    a = dict(p=[1, 2], q=dict(x=1), r=1)
+    b = dict(p=dict(x=1), q=[1, 2], r=1.0)
+    ops = check_patch(a, b)
+    assert [op.path for op in ops] == [('p', ), ('q', ), ('r', )]
+
+    # values of different types are changes, even if they are equal in
+    # Python
+    assert check_patch(
+        dict(a=1), dict(a=True)) == [DiffOperation('replace', ('a', ), True)]
+    assert check_patch(
+        dict(a=1), dict(a=1.0)) == [DiffOperation('replace', ('a', ), 1.0)]
+    assert check_patch([1, 2], [True, 2.0]) == [
+        DiffOperation('replace', (0, ), True),
+        DiffOperation('replace', (1, ), 2.0),
+    ]
+
+    with pytest.raises(ValueError):
+        metalib.diff(dict(x=1), [1])
+
+
+def test_digests_match_nodes():
+    obj = create_obj()
+    digests = _diff._digests(obj)
+    assert digests[id(obj)] == metalib.from_obj(obj).digest()
+    assert digests[id(obj['params'])] == metalib.from_obj(
+        obj['params']).digest()
+
+
+def test_patch_copies_values():
+    a = metalib.from_obj(dict(x=1))
+    b = metalib.from_obj(dict(x=1, y=dict(z=[1])))
+    ops = metalib.diff(a, b)
+    metalib.apply_patch(a, ops)
+    a.y.z.append(2)
+    assert list(b.y.z) == [1]
+
+    # the patched metadata is kept consistent (e.g. inheritance)
+    assert a.y.x == 1
+
+
+def test_invalid_patch():
+    meta = metalib.from_obj(create_obj())
+    with pytest.raises(ValueError):
+        metalib.apply_patch(meta, [('move', ('name', ), None)])
+    with pytest.raises(ValueError):
+        metalib.apply_patch(meta, [('add', ('name', ), 'x')])
+    with pytest.raises(KeyError):
+        metalib.apply_patch(meta, [('replace', ('missing', ), 'x')])
+    with pytest.raises(ValueError):
+        metalib.apply_patch(meta, [('replace', (), 'x')])
+
+
+@pytest.mark.parametrize('max_cost', [256, 2])
+def test_random_sequences(monkeypatch, max_cost: int):
+    # the diff is correct if the search for the shortest edit script is
+    # cut off
+    monkeypatch.setattr(_diff, '_MAX_EDIT_COST', max_cost)
+    rnd = random.Random(0)
+    for _ in range(200):
+        a = [rnd.choice([1, 2, 'a', dict(x=1), [1]]) for _ in range(20)]
+        b = [rnd.choice([1, 2, 'a', dict(x=2), [1]]) for _ in range(20)]
+        check_patch(dict(v=a), dict(v=b))
+
+
+def test_longest_common_subsequence():
+    def lcs_length(a, b):
+        previous = [0] * (len(b) + 1)
+        for x in a:
+            current = [0]
+            for j, y in enumerate(b):
+                if x == y:
+                    current.append(previous[j] + 1)
+                else:
+                    current.append(max(previous[j + 1], current[j]))
+            previous = current
+        return previous[-1]
+
+    rnd = random.Random(1)
+    for _ in range(500):
+        a = [rnd.choice('abcd') for _ in range(rnd.randint(0, 15))]
+        b = [rnd.choice('abcd') for _ in range(rnd.randint(0, 15))]
+        matches = _diff._match_sequences(a, b)
+        assert all(a[i] == b[j] for i, j in matches)
+        assert all(i1 < i2 and j1 < j2
+                   for (i1, j1), (i2, j2) in zip(matches, matches[1:]))
+        assert len(matches) == lcs_length(a, b)
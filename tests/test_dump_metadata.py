@@ -1,6 +1,7 @@
 from typing import Mapping, Sequence
 from metalib.core import MetadataMutableMappingNode, MetadataScalarNode
 from pathlib import Path
+import subprocess
 
 import metalib
 from metalib import MetadataMutableMappingNode
@@ -85,3 +86,72 @@ def test_dump_metadata(tmp_path: Path):
                 right), f'{str(left)} != {str(right)} @ {level}'
 
     compare_object_trees(dumped, obj)
+
+
+def test_dump_does_not_modify_original(tmp_path: Path):
+    (tmp_path / 'source.yaml').write_text('# comment\n'
+                                          'name: Test  # name\n'
+                                          '$history:\n'
+                                          '  - $script: a.py\n')
+    meta = metalib.from_yaml(tmp_path / 'source.yaml')
+    meta.to_yaml(tmp_path / 'dump.yaml')
+
+    # the history of the original metadata is unchanged
+    assert len(meta['$history']) == 1
+
+    # comments are preserved and the history is appended
+    text = (tmp_path / 'dump.yaml').read_text()
+    assert text.startswith('# comment\nname: Test  # name\n')
+    dumped = metalib.from_yaml(tmp_path / 'dump.yaml')
+    assert len(dumped['$history']) == 2
+    assert dumped['$history'][0]['$script'] == 'a.py'
+
+
+def test_dump_with_provenance(tmp_path: Path):
+    meta = metalib.from_obj(dict(name='Test'))
+    provenance = metalib.Provenance('pipeline.py', 'abc1234')
+    meta.to_yaml(tmp_path / 'dump.yaml', provenance=provenance)
+
+    dumped = metalib.from_yaml(tmp_path / 'dump.yaml')
+    assert dumped['$history'][-1]['$script'] == 'pipeline.py'
+    assert dumped['$history'][-1]['$git-commit'] == 'abc1234'
+
+
+def test_captured_provenance():
+    provenance = metalib.Provenance.capture()
+    assert provenance.script == 'test_dump_metadata.py'
+    assert provenance.git_commit == _get_git_commit_hash()
+
+
+def test_git_commit_hash_is_cached(tmp_path: Path, monkeypatch):
+    calls = []
+
+    def check_output(args, **kwargs):
+        if args[1] == 'rev-parse':
+            return f'{tmp_path}\n'
+        if args[1] == 'ls-files':
+            return 'tracked.txt\0'
+        calls.append(args)
+        return 'abc1234\n'
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(subprocess, 'check_output', check_output)
+    assert _get_git_commit_hash() == 'abc1234'
+    assert _get_git_commit_hash() == 'abc1234'
+    assert len(calls) == 1
+
+    # changes of the repository state invalidate the cache
+    (tmp_path / '.git').mkdir()
+    (tmp_path / '.git/HEAD').write_text('ref: refs/heads/main\n')
+    assert _get_git_commit_hash() == 'abc1234'
+    assert len(calls) == 2
+    (tmp_path / '.git/index').write_bytes(b'index')
+    assert _get_git_commit_hash() == 'abc1234'
+    assert len(calls) == 3
+
+    # so do modifications of tracked files, which are not in the index
+    (tmp_path / 'tracked.txt').write_text('modified')
+    assert _get_git_commit_hash() == 'abc1234'
+    assert len(calls) == 4
+    assert _get_git_commit_hash() == 'abc1234'
+    assert len(calls) == 4
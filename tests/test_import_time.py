@@ -0,0 +1,60 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import metalib
+
+# packages that must not be imported by `import metalib`
+HEAVY_MODULES = ('numpy', 'pandas', 'ruamel.yaml', 'toolz')
+
+
+def import_times(statement: str) -> dict:
+    # cumulative import times in microseconds of all modules imported by
+    # the statement (measured with `python -X importtime`)
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=Path(metalib.__file__).parent.parent,
+        stderr=subprocess.PIPE,
+        check=True,
+        text=True)
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_is_lazy():
+    times = import_times('import metalib; metalib.from_obj(dict(a=1))')
+    assert 'metalib' in times
+    for module in HEAVY_MODULES:
+        assert module not in times, f'"{module}" imported by metalib'
+
+    # the package imports faster than the deferred dependencies
+    heavy = import_times('import numpy, pandas, ruamel.yaml, toolz')
+    assert times['metalib'] < sum(heavy[module] for module in HEAVY_MODULES)
+
+
+def test_lazy_attributes():
+    times = import_times('import metalib; metalib.from_yaml')
+    assert 'ruamel.yaml' in times
+    assert 'pandas' not in times
+
+    assert metalib.to_dataframe is metalib._dataframe.to_dataframe
+    assert 'scan' in dir(metalib)
+
+    with pytest.raises(AttributeError):
+        metalib.missing
+
+
+def test_star_import():
+    namespace = {}
+    exec('from metalib import *', namespace)
+    for name in ('from_obj', 'from_yaml', 'to_yaml', 'to_dataframe',
+                 'load_many', 'async_save_many', 'MetadataNode'):
+        assert namespace[name] is getattr(metalib, name)
+    assert set(metalib.__all__) <= set(dir(metalib))
@@ -0,0 +1,65 @@
+from pathlib import Path
+
+import metalib
+from metalib import _instrument
+
+
+def create_metadata():
+    return metalib.from_obj(
+        dict(name='root', child=dict(sub=dict(subsub=dict(x=1)))))
+
+
+def test_disabled_by_default():
+    assert _instrument._active is None
+    meta = create_metadata()
+    assert meta.child.sub.subsub.name == 'root'
+
+
+def test_counters():
+    with metalib.instrument() as stats:
+        meta = create_metadata()
+        node = meta.child.sub.subsub
+        assert node.name == 'root'
+        assert node.name == 'root'
+        assert not node.has_param('missing')
+        assert _instrument._active is stats
+    assert _instrument._active is None
+
+    report = stats.report()
+    assert report['counters']['nodes_created'] == 4
+    assert report['counters']['resolve.hit'] == 1
+    assert report['counters']['resolve.miss'] == 2
+    assert report['counters']['has_param.miss'] == 1
+    # the lookup of `name` stopped at the root, the miss also searched it
+    assert report['lookup_depths'] == {3: 1, 4: 1}
+
+
+def test_timings(tmp_path: Path):
+    with metalib.instrument() as stats:
+        meta = create_metadata()
+        meta.to_yaml(tmp_path / 'dump.yaml')
+        metalib.from_yaml(tmp_path / 'dump.yaml', cache=tmp_path / 'cache')
+        metalib.from_yaml(tmp_path / 'dump.yaml', cache=tmp_path / 'cache')
+
+    timings = stats.report()['timings']
+    assert timings['to_yaml']['calls'] == 1
+    assert timings['yaml.dump']['calls'] == 1
+    assert timings['from_yaml']['calls'] == 2
+    assert timings['yaml.load']['calls'] == 1  # second load is cached
+    assert timings['from_yaml']['seconds'] > 0
+    assert stats.counters['parse_cache.miss'] == 1
+    assert stats.counters['parse_cache.hit'] == 1
+
+
+def test_hook_and_nesting():
+    reports = []
+    with metalib.instrument(hook=reports.append) as outer:
+        create_metadata()
+        with metalib.instrument(hook=reports.append) as inner:
+            create_metadata()
+        assert _instrument._active is outer
+
+    assert inner.counters['nodes_created'] == 1
+    assert outer.counters['nodes_created'] == 2
+    assert [report['counters']['nodes_created']
+            for report in reports] == [1, 2]
@@ -0,0 +1,90 @@
+from pathlib import Path
+
+import metalib
+
+
+def create_obj():
+    return dict(
+        name='test',
+        params=[
+            dict(p1='a', p3=[11, 22, 33], p4=dict(x=1)),
+            dict(p1='a', p3=[11, 22, 33], p4=dict(x=1)),
+            dict(p1='b', p3=[11, 22, 33], p4=dict(x=1.0)),
+            dict(p1='b', p3=[11, 22, 33], p4=dict(x=True)),
+        ],
+    )
+
+
+def test_identical_subtrees_are_shared():
+    obj = create_obj()
+    meta = metalib.from_obj(obj, intern=True)
+
+    params = obj['params']
+    assert params[0] is params[1]
+    assert params[0]['p3'] is params[2]['p3'] is params[3]['p3']
+
+    # 1, 1.0 and True are different values
+    assert params[0]['p4'] is not params[2]['p4']
+    assert params[2]['p4'] is not params[3]['p4']
+    assert type(params[2]['p4']['x']) is float
+
+    # the metadata is unchanged
+    assert obj == create_obj()
+    assert meta.params[1].p3[1] == 22
+    assert meta.params[0] is not meta.params[1]
+    assert meta.params[1]._parent is meta.params
+
+
+def test_no_interning_by_default():
+    obj = create_obj()
+    metalib.from_obj(obj)
+    assert obj['params'][0] is not obj['params'][1]
+
+
+def test_copy_on_write():
+    obj = create_obj()
+    meta = metalib.from_obj(obj, intern=True)
+
+    meta.params[1].p3[0] = 10
+    meta.params[2].p4['y'] = 2
+    meta.params[3].p3.append(44)
+    del meta.params[0]['p1']
+
+    expected = create_obj()
+    expected['params'][1]['p3'][0] = 10
+    expected['params'][2]['p4']['y'] = 2
+    expected['params'][3]['p3'].append(44)
+    del expected['params'][0]['p1']
+    assert obj == expected
+    assert meta.params[0].p3[0] == 11
+    assert meta.params[1].p3[0] == 10
+
+
+def test_structured_query_after_copy_on_write():
+    meta = metalib.from_obj(create_obj(), intern=True)
+    assert len(list(meta.query(where={'p1': 'a'}, has=['p3']))) == 2
+
+    meta.params[1]['p1'] = 'c'
+    result = list(meta.query(where={'p1': 'a'}, has=['p3']))
+    assert len(result) == 1
+    assert result[0] is meta.params[0]
+
+
+def test_save_interned_metadata(tmp_path: Path):
+    metalib.from_obj(create_obj()).to_yaml(tmp_path / 'plain.yaml')
+    metalib.from_obj(create_obj(),
+                     intern=True).to_yaml(tmp_path / 'interned.yaml')
+
+    def without_history(filename: Path):
+        return (tmp_path / filename).read_text().split('$history')[0]
+
+    # shared subtrees are not written as YAML aliases
+    assert '&' not in without_history('interned.yaml')
+    assert without_history('interned.yaml') == without_history('plain.yaml')
+
+
+def test_interned_yaml():
+    filename = Path(__file__).parent / 'data/test.yaml'
+    meta = metalib.from_yaml(filename, mode='fast', intern=True)
+    assert meta._ref == metalib.from_yaml(filename, mode='fast')._ref
+    assert meta.datasets[0].piv_region == '16x16'
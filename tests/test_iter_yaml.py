@@ -0,0 +1,57 @@
+from pathlib import Path
+
+import pytest
+
+import metalib
+
+
+def test_iterate_over_list_entries():
+    filename = Path(__file__).parent / 'data/test.yaml'
+    meta = metalib.from_yaml(filename)
+    entries = list(metalib.iter_yaml(filename, key='datasets'))
+
+    assert len(entries) == len(meta.datasets)
+    for entry, dataset in zip(entries, meta.datasets):
+        assert entry._ref == dataset._ref
+        assert entry._filename == 'test.yaml'
+
+    # parameters preceding the list are inherited
+    assert entries[0].piv_region == '16x16'
+    assert entries[0].stage_position.x == 4850
+
+
+def test_entries_are_parsed_lazily(tmp_path: Path):
+    filename = tmp_path / 'test.yaml'
+    filename.write_text('name: test\n'
+                        'params:\n'
+                        '  - {a: 1}\n'
+                        '  - {a: 2}\n'
+                        '  - {a: [3\n')  # broken entry
+
+    entries = metalib.iter_yaml(filename)
+    first = next(entries)
+    assert first.a == 1
+    assert first.name == 'test'
+    assert next(entries).a == 2
+    with pytest.raises(Exception):
+        next(entries)
+
+
+def test_top_level_list(tmp_path: Path):
+    filename = tmp_path / 'test.yaml'
+    filename.write_text('- a: 1\n- a: 2\n- 3\n')
+
+    entries = list(metalib.iter_yaml(filename, key=None))
+    assert entries[0].a == 1
+    assert entries[1]._filename == 'test.yaml'
+    assert entries[2]._ref == 3
+
+
+def test_missing_key(tmp_path: Path):
+    filename = tmp_path / 'test.yaml'
+    filename.write_text('name: test\nvalues: [1, 2]\n')
+
+    with pytest.raises(KeyError):
+        list(metalib.iter_yaml(filename))
+    with pytest.raises(ValueError):
+        list(metalib.iter_yaml(filename, key='name'))
@@ -0,0 +1,62 @@
+from pathlib import Path
+import shutil
+
+import pytest
+
+import metalib
+
+
+@pytest.fixture
+def metadata_dir(tmp_path: Path) -> Path:
+    source = Path(__file__).parent / 'data/test.yaml'
+    for k in range(6):
+        shutil.copy(source, tmp_path / f'test{k}.yaml')
+    return tmp_path
+
+
+def test_load_directory(metadata_dir: Path):
+    result = metalib.load_many(metadata_dir, workers=1)
+
+    assert len(result) == 6
+    assert [meta._filename
+            for meta in result] == [f'test{k}.yaml' for k in range(6)]
+    assert all(meta._path == metadata_dir for meta in result)
+    assert result[0].datasets[0].piv_region == '16x16'
+
+
+def test_load_glob_in_worker_processes(metadata_dir: Path):
+    result = metalib.load_many(str(metadata_dir / 'test[0-2].yaml'), workers=2)
+
+    assert len(result) == 3
+    assert result[2]._filename == 'test2.yaml'
+    assert result[2].stage_position.x == 4850
+
+
+def test_load_list_of_files(metadata_dir: Path):
+    filenames = [metadata_dir / 'test3.yaml', metadata_dir / 'test1.yaml']
+    result = metalib.load_many(filenames, workers=2)
+
+    assert [meta._filename for meta in result] == ['test3.yaml', 'test1.yaml']
+
+
+def test_errors_are_reported_per_file(metadata_dir: Path):
+    (metadata_dir / 'broken.yaml').write_text('a: [1, 2\n')
+    (metadata_dir / 'scalar.yaml').write_text('1234\n')
+
+    with pytest.raises(metalib.MetadataLoadError) as info:
+        metalib.load_many(metadata_dir, workers=2)
+    assert set(info.value.errors) == {
+        metadata_dir / 'broken.yaml', metadata_dir / 'scalar.yaml'
+    }
+    assert len(info.value.results) == 6
+
+    result = metalib.load_many(metadata_dir, workers=1, errors='skip')
+    assert len(result) == 6
+
+
+def test_load_in_roundtrip_mode(metadata_dir: Path):
+    result = metalib.load_many(metadata_dir, workers=2, mode='roundtrip')
+
+    assert len(result) == 6
+    assert result[0]._yaml_serializer is not None
+    assert result[0]._ref == metalib.load_many(metadata_dir, workers=1)[0]._ref
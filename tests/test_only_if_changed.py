@@ -0,0 +1,104 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+import metalib
+
+
+def create_file(filename: Path) -> Path:
+    obj = dict(name='test', x=[1, 2, 3], params=[dict(p=1), dict(p=2)])
+    metalib.from_obj(obj).to_yaml(filename)
+    return filename
+
+
+def history_length(filename: Path) -> int:
+    return len(metalib.from_yaml(filename)['$history'])
+
+
+@pytest.mark.parametrize('mode', ['roundtrip', 'fast'])
+def test_unchanged_is_skipped(tmp_path: Path, mode: str):
+    filename = create_file(tmp_path / 'data.yaml')
+    text = filename.read_text()
+    meta = metalib.from_yaml(filename, mode=mode)
+    assert not meta._tree.dirty
+    assert meta.params[0].p == 1  # reading does not modify
+
+    with metalib.instrument() as stats:
+        assert not meta.to_yaml(filename, only_if_changed=True)
+    assert stats.counters['to_yaml.skipped'] == 1
+    assert filename.read_text() == text
+
+    # written without the flag
+    assert meta.to_yaml(filename)
+    assert history_length(filename) == 2
+
+
+@pytest.mark.parametrize('modify', [
+    lambda meta: meta.__setitem__('name', 'other'),
+    lambda meta: meta.__delitem__('name'),
+    lambda meta: meta.params[1].__setitem__('q', 3),
+    lambda meta: meta.params.insert(0, dict(p=0)),
+    lambda meta: meta.params.append(dict(p=3)),
+    lambda meta: meta.params.__delitem__(0),
+    lambda meta: meta.x.extend([4]),
+])
+def test_modification_is_written(tmp_path: Path, modify):
+    filename = create_file(tmp_path / 'data.yaml')
+    meta = metalib.from_yaml(filename)
+    modify(meta)
+    assert meta._tree.dirty
+    assert meta.to_yaml(filename, only_if_changed=True)
+    assert history_length(filename) == 2
+
+    # the saved tree is clean again
+    assert not meta._tree.dirty
+    assert not meta.to_yaml(filename, only_if_changed=True)
+    assert history_length(filename) == 2
+
+
+def test_array_modification(tmp_path: Path):
+    filename = create_file(tmp_path / 'data.yaml')
+    meta = metalib.from_yaml(filename, arrays=True)
+    meta.x[0] = 5
+    assert meta.to_yaml(filename, only_if_changed=True)
+
+
+def test_other_targets_are_written(tmp_path: Path):
+    filename = create_file(tmp_path / 'data.yaml')
+    meta = metalib.from_yaml(filename)
+
+    # another file or metadata that was not loaded from a file
+    assert meta.to_yaml(tmp_path / 'copy.yaml', only_if_changed=True)
+    assert metalib.from_obj(dict(a=1)).to_yaml(tmp_path / 'new.yaml',
+                                               only_if_changed=True)
+
+    # the entries of `iter_yaml` and subtrees do not mirror the whole file
+    entry = next(metalib.iter_yaml(filename))
+    assert entry.to_yaml(filename, only_if_changed=True)
+    assert meta.params.to_yaml(filename, only_if_changed=True)
+
+
+def test_changed_file_is_written(tmp_path: Path):
+    filename = create_file(tmp_path / 'data.yaml')
+    meta = metalib.from_yaml(filename)
+    filename.write_text('name: changed\n')
+    assert meta.to_yaml(filename, only_if_changed=True)
+    assert metalib.from_yaml(filename).name == 'test'
+
+    filename.unlink()
+    assert meta.to_yaml(filename, only_if_changed=True)
+
+
+def test_load_many_and_async(tmp_path: Path):
+    filenames = [create_file(tmp_path / f'data{k}.yaml') for k in range(3)]
+    metadata = metalib.load_many(filenames, workers=1)
+    metadata[1]['name'] = 'other'
+
+    async def save_all():
+        return await metalib.async_save_many(
+            [(filename, meta) for filename, meta in zip(filenames, metadata)],
+            only_if_changed=True)
+
+    assert asyncio.run(save_all()) == [False, True, False]
+    assert [history_length(filename) for filename in filenames] == [1, 2, 1]
@@ -0,0 +1,77 @@
+import os
+from pathlib import Path
+
+import pytest
+
+import metalib
+from metalib import ParseCache
+
+
+@pytest.fixture
+def metadata_file(tmp_path: Path) -> Path:
+    filename = tmp_path / 'test.yaml'
+    filename.write_text((Path(__file__).parent / 'data/test.yaml').read_text())
+    return filename
+
+
+def test_cache_hit_skips_parsing(metadata_file: Path, tmp_path: Path,
+                                 monkeypatch):
+    cache = ParseCache(tmp_path / 'cache')
+    meta = metalib.from_yaml(metadata_file, cache=cache)
+    assert len(list(cache.directory.glob('*.pickle'))) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError('file was parsed')
+
+    monkeypatch.setattr('ruamel.yaml.YAML.load', fail)
+    cached = metalib.from_yaml(metadata_file, cache=cache)
+    assert cached._ref == meta._ref
+    assert cached._filename == 'test.yaml'
+    assert cached._path == metadata_file.parent
+    assert cached.datasets[0].piv_region == '16x16'
+
+
+def test_cache_preserves_formatting(metadata_file: Path, tmp_path: Path):
+    metalib.from_yaml(metadata_file, cache=tmp_path / 'cache')
+    cached = metalib.from_yaml(metadata_file, cache=tmp_path / 'cache')
+    cached.to_yaml(tmp_path / 'dump.yaml')
+
+    # comments of the original file are preserved
+    text = (tmp_path / 'dump.yaml').read_text()
+    assert '# setup configuration\n' in text
+    assert 'wall_distance: 50  # [mm] distance between nozzle and wall' in text
+
+
+def test_stale_entries_are_detected(metadata_file: Path, tmp_path: Path):
+    cache = ParseCache(tmp_path / 'cache')
+    metalib.from_yaml(metadata_file, mode='fast', cache=cache)
+
+    metadata_file.write_text('name: changed\n')
+    meta = metalib.from_yaml(metadata_file, mode='fast', cache=cache)
+    assert meta.name == 'changed'
+    assert meta._ref == {'name': 'changed'}
+
+
+def test_cache_is_size_bounded(tmp_path: Path):
+    cache = ParseCache(tmp_path / 'cache', max_size=1000)
+    filenames = []
+    for k in range(10):
+        filename = tmp_path / f'test{k}.yaml'
+        filename.write_text(
+            f'name: test{k}\ndata: [{", ".join(["1"] * 50)}]\n')
+        filenames.append(filename)
+
+    for k, filename in enumerate(filenames):
+        metalib.from_yaml(filename, mode='fast', cache=cache)
+        # use the first file repeatedly
+        if k > 0:
+            os.utime(cache._entry_filename(filenames[0], 'fast'),
+                     ns=(0, 2**62))
+    entries = list(cache.directory.glob('*.pickle'))
+    assert sum(entry.stat().st_size for entry in entries) <= 1000
+    assert len(entries) < 10
+
+    # the least recently used entries are removed first
+    assert cache._entry_filename(filenames[0], 'fast').exists()
+    assert cache._entry_filename(filenames[-1], 'fast').exists()
+    assert not cache._entry_filename(filenames[1], 'fast').exists()
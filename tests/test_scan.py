@@ -0,0 +1,56 @@
+from pathlib import Path
+
+import pytest
+
+import metalib
+
+
+@pytest.fixture
+def metadata_dir(tmp_path: Path) -> Path:
+    for k in range(4):
+        (tmp_path / f'run{k}.yaml').write_text(
+            f'run: {k}\n'
+            f'datasets:\n'
+            f'  - {{Re: {1000 * k}}}\n'
+            f'  - {{Re: {1000 * k + 500}}}\n')
+    (tmp_path / 'multi.yaml').write_text('run: 10\n'
+                                         'datasets: [{Re: 100}]\n'
+                                         '---\n'
+                                         'run: 11\n'
+                                         'datasets: [{Re: 200}]\n')
+    return tmp_path
+
+
+@pytest.mark.parametrize('prefetch', [0, 1, 3])
+def test_scan_documents(metadata_dir: Path, prefetch: int):
+    documents = list(metalib.scan(metadata_dir, prefetch=prefetch))
+
+    # one document per file, two documents in the multi-document file
+    assert [meta.run for meta in documents] == [10, 11, 0, 1, 2, 3]
+    assert documents[1]._filename == 'multi.yaml'
+    assert documents[2]._filename == 'run0.yaml'
+
+
+def test_scan_query(metadata_dir: Path):
+    scan = metalib.scan(str(metadata_dir / '*.yaml'))
+    result = list(scan.query(lambda node: node.get('Re', 0) > 1500))
+
+    assert [node.Re for node in result] == [2000, 2500, 3000, 3500]
+    assert [node.run for node in result] == [2, 2, 3, 3]
+
+    result = list(metalib.scan(metadata_dir).query(where={'Re': 200}))
+    assert len(result) == 1
+    assert result[0].run == 11
+
+
+def test_scan_first(metadata_dir: Path):
+    scan = metalib.scan(metadata_dir, mode='roundtrip')
+    assert scan.first(where={'Re': 1000}).run == 1
+    with pytest.raises(RuntimeError):
+        scan.first(where={'Re': 1})
+
+
+def test_scan_stops_early(metadata_dir: Path):
+    documents = iter(metalib.scan(metadata_dir, prefetch=2))
+    assert next(documents).run == 10
+    documents.close()
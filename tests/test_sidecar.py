@@ -0,0 +1,126 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import metalib
+
+
+def create_metadata():
+    return metalib.from_obj(
+        dict(name='test',
+             small=np.arange(3),
+             datasets=[dict(signal=np.linspace(0.0, 1.0, 2000))]))
+
+
+def test_large_arrays_are_saved_in_sidecar_files(tmp_path: Path):
+    create_metadata().to_yaml(tmp_path / 'data.yaml')
+
+    sidecars = list(tmp_path.glob('*.npy'))
+    assert len(sidecars) == 1
+    assert sidecars[0].name.startswith('data.yaml.')
+
+    text = (tmp_path / 'data.yaml').read_text()
+    assert f'signal: !npy {sidecars[0].name}\n' in text
+    assert 'small: [0, 1, 2]\n' in text
+
+
+@pytest.mark.parametrize('mode', ['roundtrip', 'fast'])
+def test_sidecar_files_are_memory_mapped(tmp_path: Path, mode: str):
+    create_metadata().to_yaml(tmp_path / 'data.yaml')
+
+    meta = metalib.from_yaml(tmp_path / 'data.yaml', mode=mode)
+    signal = meta.datasets[0].signal
+    assert isinstance(signal, metalib.MetadataArrayNode)
+    assert isinstance(signal.values, np.memmap)
+    assert not signal.values.flags.writeable
+    assert np.allclose(signal.values, np.linspace(0.0, 1.0, 2000))
+
+
+def test_sidecar_files_are_written_once(tmp_path: Path):
+    create_metadata().to_yaml(tmp_path / 'data.yaml')
+    meta = metalib.from_yaml(tmp_path / 'data.yaml')
+
+    # saving to the same directory refers to the existing sidecar file
+    meta['name'] = 'changed'
+    meta.to_yaml(tmp_path / 'data.yaml')
+    assert len(list(tmp_path.glob('*.npy'))) == 1
+    assert metalib.from_yaml(tmp_path / 'data.yaml').name == 'changed'
+
+    # saving to another directory copies the array
+    (tmp_path / 'copy').mkdir()
+    meta.to_yaml(tmp_path / 'copy/other.yaml')
+    sidecars = list((tmp_path / 'copy').glob('*.npy'))
+    assert len(sidecars) == 1
+    assert sidecars[0].name.startswith('other.yaml.')
+    copy = metalib.from_yaml(tmp_path / 'copy/other.yaml')
+    assert np.array_equal(copy.datasets[0].signal.values,
+                          meta.datasets[0].signal.values)
+
+
+def test_sidecar_files_with_other_loaders(tmp_path: Path):
+    create_metadata().to_yaml(tmp_path / 'data.yaml')
+
+    entry = next(metalib.iter_yaml(tmp_path / 'data.yaml', key='datasets'))
+    assert len(entry.signal) == 2000
+
+    meta, = metalib.load_many(tmp_path, workers=1)
+    assert len(meta.datasets[0].signal) == 2000
+
+
+def test_unused_sidecar_files_are_removed(tmp_path: Path):
+    filename = tmp_path / 'data.yaml'
+    create_metadata().to_yaml(filename)
+    for name in ('data.v2.yaml', 'data.yml'):
+        metalib.from_obj(dict(signal=np.zeros(2000))).to_yaml(tmp_path / name)
+    for k in range(3):
+        meta = metalib.from_yaml(filename)
+        meta.datasets[0]['signal'] = np.linspace(0.0, k + 2.0, 2000)
+        meta.to_yaml(filename)
+
+    # only the sidecar files of the current versions remain
+    sidecars = sorted(path.name for path in tmp_path.glob('*.npy'))
+    assert len(sidecars) == 3
+    assert [name.rsplit('.', 2)[0]
+            for name in sidecars] == ['data.v2.yaml', 'data.yaml', 'data.yml']
+    assert f'signal: !npy {sidecars[1]}\n' in filename.read_text()
+    assert np.allclose(
+        metalib.from_yaml(filename).datasets[0].signal.values,
+        np.linspace(0.0, 4.0, 2000))
+
+
+def test_sidecar_files_are_not_shared(tmp_path: Path):
+    create_metadata().to_yaml(tmp_path / 'data.yaml')
+    meta = metalib.from_yaml(tmp_path / 'data.yaml')
+
+    # another metadata file in the same directory gets its own sidecar
+    meta.to_yaml(tmp_path / 'other.yaml')
+    assert len(list(tmp_path.glob('other.yaml.*.npy'))) == 1
+
+    # so removing the sidecar of the first file keeps the copy intact
+    meta.datasets[0]['signal'] = np.zeros(2000)
+    meta.to_yaml(tmp_path / 'data.yaml')
+    copy = metalib.from_yaml(tmp_path / 'other.yaml')
+    assert np.allclose(copy.datasets[0].signal.values,
+                       np.linspace(0.0, 1.0, 2000))
+
+
+def test_files_with_the_same_stem(tmp_path: Path):
+    create_metadata().to_yaml(tmp_path / 'run.yaml')
+    metalib.from_obj(dict(name='plain')).to_yaml(tmp_path / 'run.yml')
+    meta = metalib.from_yaml(tmp_path / 'run.yaml')
+    assert len(meta.datasets[0].signal) == 2000
+
+
+def test_plain_metadata_does_not_clean_up(tmp_path: Path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(metalib._yaml, '_remove_unused_sidecars',
+                        lambda *args: calls.append(args))
+    metalib.from_obj(dict(name='plain')).to_yaml(tmp_path / 'a.yaml')
+    metalib.from_obj(dict(name='plain')).to_yaml(tmp_path / 'a.yaml')
+    assert not calls
+
+    # files that referred to sidecar files before are cleaned up
+    create_metadata().to_yaml(tmp_path / 'b.yaml')
+    metalib.from_obj(dict(name='plain')).to_yaml(tmp_path / 'b.yaml')
+    assert len(calls) == 2